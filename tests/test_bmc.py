@@ -0,0 +1,67 @@
+"""
+BMC Tests
+
+This file is part of uSMPT.
+
+uSMPT is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+uSMPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with uSMPT. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from os.path import abspath, dirname, join
+from shutil import which
+
+import pytest
+
+from usmpt.checkers.bmc import BMC
+from usmpt.ptio.formula import Formula
+from usmpt.ptio.ptnet import PetriNet
+
+requires_z3 = pytest.mark.skipif(which('z3') is None, reason="z3 is not installed")
+
+NETS = join(dirname(dirname(abspath(__file__))), 'nets')
+
+
+def smtlib_set_initial_marking(ptnet: PetriNet, k: int) -> str:
+    return ''.join(f"(assert (= {pl}@{k} {ptnet.initial_marking[pl]}))\n" for pl in ptnet.places)
+
+
+def smtlib_transition_relation(ptnet: PetriNet, k: int, k_prime: int, guard: str) -> str:
+    transitions = []
+    for tr in ptnet.transitions:
+        conditions = [f"(>= {pl}@{k} {weight})" for pl, weight in ptnet.pre[tr].items()]
+        conditions += [f"(= {pl}@{k_prime} (+ {pl}@{k} {ptnet.post[tr].get(pl, 0) - ptnet.pre[tr].get(pl, 0)}))" for pl in ptnet.places]
+        transitions.append(f"(and {' '.join(conditions)})")
+
+    return f"(assert (=> {guard} (or {' '.join(transitions)})))\n"
+
+
+@requires_z3
+def test_bmc_guarded_transition_relation(monkeypatch):
+    ptnet = PetriNet(join(NETS, 'BMC', 'safe_net.net'))
+
+    guards = []
+    def transition_relation(k, k_prime, guard=None):
+        guards.append(guard)
+        return smtlib_transition_relation(ptnet, k, k_prime, guard)
+
+    monkeypatch.setattr(ptnet, 'smtlib_set_initial_marking', lambda k=None: smtlib_set_initial_marking(ptnet, k))
+    monkeypatch.setattr(ptnet, 'smtlib_transition_relation', transition_relation)
+
+    bmc = BMC(ptnet, Formula(path_formula=join(NETS, 'BMC', 'reachable.formula')), horizon=4)
+    try:
+        assert bmc.prove_helper() == 2
+    finally:
+        bmc.solver.kill()
+
+    # Each iteration is guarded by its own literal
+    assert guards == ["t_{}".format(k) for k in range(1, 5)]
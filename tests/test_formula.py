@@ -0,0 +1,68 @@
+"""
+Formula Tests
+
+This file is part of uSMPT.
+
+uSMPT is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+uSMPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with uSMPT. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from shutil import which
+
+import pytest
+
+from usmpt.interfaces.z3 import Z3
+from usmpt.ptio.formula import Formula
+
+requires_z3 = pytest.mark.skipif(which('z3') is None, reason="z3 is not installed")
+
+PLACES = ['p1', 'p2', 'p3', 'p4']
+
+FORMULAS = [
+    "p1 = 1 /\\ p2 = 1",
+    "p1 != p2",
+    "T",
+    "- F",
+    "- (p1 >= 2)",
+    "(p1 + p2 <= 3 \\/ p3 > 1) /\\ (p4 < 2 /\\ -(p1 = p2))",
+    "2*p3 + p4 + 3 >= 7",
+    "p1 = 0 /\\ p2 = 1 \\/ p3 = 1",
+    "((p4 = 1))",
+]
+
+MARKINGS = [
+    {'p1': 0, 'p2': 0, 'p3': 0, 'p4': 0},
+    {'p1': 1, 'p2': 1, 'p3': 2, 'p4': 1},
+    {'p1': 2, 'p2': 0, 'p3': 1, 'p4': 3},
+    {'p1': 0, 'p2': 1, 'p3': 0, 'p4': 1},
+]
+
+
+@requires_z3
+@pytest.mark.parametrize('formula', FORMULAS)
+def test_evaluate_matches_z3(formula):
+    solver = Z3()
+    try:
+        solver.write(''.join(f"(declare-const {pl} Int)\n" for pl in PLACES))
+        for marking in MARKINGS:
+            solver.push()
+            solver.write(''.join(f"(assert (= {pl} {tokens}))\n" for pl, tokens in marking.items()))
+            solver.write(Formula(formula).smtlib(assertion=True))
+            assert solver.check_sat() == Formula(formula).evaluate(marking)
+            solver.pop()
+    finally:
+        solver.kill()
+
+
+def test_evaluate_missing_place():
+    assert Formula("p1 = 1").evaluate({}) is None
@@ -0,0 +1,132 @@
+"""
+z3 Interface Tests
+
+This file is part of uSMPT.
+
+uSMPT is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+uSMPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with uSMPT. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from shutil import which
+
+import pytest
+
+from usmpt.interfaces.solver import Solver
+from usmpt.interfaces.z3 import PortfolioZ3, Z3, Z3Pool
+
+requires_z3 = pytest.mark.skipif(which('z3') is None, reason="z3 is not installed")
+
+
+@requires_z3
+def test_portfolio_redeclaration_after_pop():
+    solver = PortfolioZ3()
+    try:
+        solver.push()
+        solver.write("(declare-const x Int)\n")
+        solver.pop()
+        solver.push()
+        solver.write("(declare-const x Int)\n")
+        solver.write("(assert (> x 0))\n")
+        assert solver.check_sat()
+
+        # A replaced solver replays the scopes
+        solver.replace(1)
+        assert solver.check_sat()
+    finally:
+        solver.kill()
+
+
+@requires_z3
+def test_declaration_dedupe():
+    solver = Z3()
+    try:
+        solver.write("(declare-const x Int)\n")
+        solver.write("(declare-const x Int)\n")
+        assert bytes(solver.buffer) == b"(declare-const x Int)\n"
+
+        # Declarations are forgotten with their scope
+        solver.push()
+        solver.write("(declare-const y Int)\n")
+        solver.pop()
+        solver.write("(declare-const y Int)\n")
+        solver.write("(assert (> x y))\n")
+        assert solver.check_sat()
+    finally:
+        solver.kill()
+
+
+@requires_z3
+def test_push_elision():
+    solver = Z3()
+    try:
+        solver.push()
+        solver.pop()
+        assert not solver.buffer
+
+        solver.push()
+        solver.write("(assert false)\n")
+        assert not solver.check_sat()
+        solver.pop()
+        assert solver.check_sat()
+    finally:
+        solver.kill()
+
+
+class FallbackZ3(Z3):
+    """ z3 interface without `check-sat-assuming`. """
+
+    check_sat_assuming = Solver.check_sat_assuming
+
+
+@requires_z3
+@pytest.mark.parametrize('backend', [Z3, FallbackZ3])
+def test_check_sat_assuming(backend):
+    solver = backend()
+    try:
+        solver.write("(declare-const a Bool)\n(assert (not a))\n")
+        assert solver.check_sat_assuming(["a"]) is False
+        assert solver.check_sat() is True
+    finally:
+        solver.kill()
+
+
+@requires_z3
+def test_pool_release_resets_scopes():
+    pool = Z3Pool(size=1)
+
+    solver = pool.acquire()
+    solver.push()
+    solver.write("(declare-const x Int)\n(assert false)\n")
+    pool.release(solver)
+
+    solver = pool.acquire()
+    try:
+        assert solver.depth == 0
+        solver.write("(declare-const x Int)\n(assert (> x 0))\n")
+        assert solver.check_sat()
+    finally:
+        solver.kill()
+
+
+@requires_z3
+def test_portfolio_check_sat_assuming_after_pop():
+    solver = PortfolioZ3()
+    try:
+        solver.write("(declare-const a Bool)\n")
+        solver.push()
+        solver.write("(assert a)\n")
+        solver.pop()
+        assert solver.check_sat_assuming(["(not a)"]) is True
+        assert all(member.depth == 0 for member in solver.solvers)
+    finally:
+        solver.kill()
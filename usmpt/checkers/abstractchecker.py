@@ -26,8 +26,7 @@ __version__ = "1.0.0"
 
 from abc import ABC, abstractmethod
 from multiprocessing import Queue
-
-from usmpt.ptio.verdict import Verdict
+from multiprocessing.connection import Connection
 
 
 class AbstractChecker(ABC):
@@ -35,13 +34,13 @@ class AbstractChecker(ABC):
     """
 
     @abstractmethod
-    def prove(self, result: Queue[Verdict], concurrent_pids: Queue[list[int]]) -> None:
+    def prove(self, result: Connection, concurrent_pids: Queue[list[int]]) -> None:
         """ Prover.
 
         Parameters
         ----------
-        result : Queue of Verdict
-            Queue to exchange the verdict.
+        result : Connection
+            Connection to send the verdict.
         concurrent_pids : Queue of int
             Queue to get the PIDs of the concurrent methods.
         """
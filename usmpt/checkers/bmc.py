@@ -25,13 +25,15 @@ __license__ = "GPLv3"
 __version__ = "1.0"
 
 
-from logging import info
+from ctypes import Array, c_int, c_longlong
+from logging import INFO, getLogger, info
 from multiprocessing import Queue
-from typing import Optional
+from multiprocessing.connection import Connection
+from typing import Iterator, Optional
 
 from usmpt.checkers.abstractchecker import AbstractChecker
-from usmpt.exec.utils import STOP, send_signal_pids, set_verbose
-from usmpt.interfaces.z3 import Z3
+from usmpt.exec.utils import STOP, send_signal_pids
+from usmpt.interfaces.z3 import BACKENDS, Z3
 from usmpt.ptio.formula import Formula
 from usmpt.ptio.ptnet import PetriNet
 from usmpt.ptio.verdict import Verdict
@@ -48,15 +50,19 @@ class BMC(AbstractChecker):
         Reachability formula.
     debug : bool
         Debugging flag.
-    induction_queue : Queue of int, optional
-        Queue for the exchange with k-induction.
+    induction_iteration : shared c_longlong, optional
+        Iteration shared with k-induction (-1 while unknown).
     show_model : bool
         Show model flag.
     solver : Z3
         SMT solver (Z3).
+    precomputed : dict of str: str
+        SMT-LIB encodings of the initial iteration computed beforehand.
+    horizon : int
+        Number of iterations encoded at once (doubled each time they are exhausted).
     """
 
-    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, induction_queue: Optional[Queue[int]] = None, solver_pids: Optional[Queue[int]] = None) -> None:
+    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, induction_iteration: Optional[c_longlong] = None, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0, backend: str = 'process', precomputed: Optional[dict[str, str]] = None, horizon: int = 32, solver: Optional[Z3] = None) -> None:
         """ Initializer.
 
         Parameters
@@ -67,10 +73,21 @@ class BMC(AbstractChecker):
             Reachability formula.
         debug : bool, optional
             Debugging flag.
-        induction_queue : Queue of int, optional
-            Queue for the exchange with k-induction.
-        solver_pids : Queue of int, optional
-            Queue to share the current PID.
+        induction_iteration : shared c_longlong, optional
+            Iteration shared between BMC and k-induction (-1 while unknown).
+        solver_pids : shared Array of int, optional
+            Shared array of solver pids.
+        solver_slot : int, optional
+            Slot of the solver pid.
+        backend : str, optional
+            z3 backend (see `BACKENDS`).
+        precomputed : dict of str: str, optional
+            SMT-LIB encodings of the initial iteration
+            (`declare_places` and `initial_marking`).
+        horizon : int, optional
+            Number of iterations encoded at once (1 for a purely incremental unrolling).
+        solver : Z3, optional
+            Solver already started (e.g. acquired from a `Z3Pool`), instead of a new one.
         """
         # Initial Petri net
         self.ptnet: PetriNet = ptnet
@@ -84,24 +101,28 @@ class BMC(AbstractChecker):
         # Debugging flag
         self.debug: bool = debug
 
-        # Queue shared with K-Induction
-        self.induction_queue: Optional[Queue[int]] = induction_queue
+        # Iteration shared with K-Induction
+        self.induction_iteration: Optional[c_longlong] = induction_iteration
 
         # SMT solver
-        self.solver: Z3 = Z3(debug=debug, solver_pids=solver_pids)
+        self.solver: Z3 = solver if solver is not None else BACKENDS[backend](debug=debug, solver_pids=solver_pids, solver_slot=solver_slot)
 
-    def prove(self, result: Queue[Verdict], concurrent_pids: Queue[list[int]]) -> None:
+        # Encodings computed beforehand
+        self.precomputed: dict[str, str] = precomputed if precomputed is not None else {}
+
+        # Unrolling horizon
+        self.horizon: int = max(1, horizon)
+
+    def prove(self, result: Connection, concurrent_pids: Queue[list[int]]) -> None:
         """ Prover.
 
         Parameters
         ----------
-        result : Queue of Verdict
-            Queue to exchange the verdict.
+        result : Connection
+            Connection to send the verdict.
         concurrent_pids : Queue of int
             Queue to get the PIDs of the concurrent methods.
         """
-        set_verbose(self.verbose)
-
         info("[BMC] RUNNING")
 
         iteration = self.prove_helper()
@@ -110,11 +131,11 @@ class BMC(AbstractChecker):
         if iteration is None or self.solver.aborted:
             return
 
-        # Put the result in the queue
+        # Send the result
         if iteration == -1:
-            result.put(Verdict.NOT_REACHABLE)
+            result.send(Verdict.NOT_REACHABLE)
         else:
-            result.put(Verdict.REACHABLE)
+            result.send(Verdict.REACHABLE)
 
         # Kill the solver
         self.solver.kill()
@@ -133,46 +154,100 @@ class BMC(AbstractChecker):
         """
         info("[BMC] > Initialization")
 
-        info("[BMC] > Declaration of the places from the Petri net (iteration: 0)")
-        self.solver.write(self.ptnet.smtlib_declare_places(0))
+        info("[BMC] > Evaluation of the formula on the initial marking (iteration: 0)")
+        if self.formula.evaluate(self.ptnet.initial_marking):
+            return 0
 
+        info("[BMC] > Declaration of the places from the Petri net (iteration: 0)")
         info("[BMC] > Initial marking of the Petri net")
-        self.solver.write(self.ptnet.smtlib_set_initial_marking(0))
-
-        info("[BMC] > Push")
-        self.solver.push()
-
-        info("[BMC] > Formula to check the satisfiability (iteration: 0)")
-        self.solver.write(self.formula.smtlib(0, assertion=True))
+        self.solver.write_batch([
+            self.precomputed.get('declare_places') or self.ptnet.smtlib_declare_places(0),
+            self.precomputed.get('initial_marking') or self.ptnet.smtlib_set_initial_marking(0)
+        ])
 
-        k = 0
+        k, k_encoded = 0, 0
+        horizon = self.horizon
         k_induction_iteration = float('inf')
 
-        while not self.solver.check_sat():
+        while True:
 
-            # Donner ce bout de code            
-            if self.induction_queue is not None and not self.induction_queue.empty():
-                k_induction_iteration = self.induction_queue.get()
+            if self.induction_iteration is not None and k_induction_iteration == float('inf'):
+                iteration = self.induction_iteration.value
+                if iteration >= 0:
+                    k_induction_iteration = iteration
 
             if k >= k_induction_iteration:
                 return -1
 
-            info("[BMC] > Pop")
-            self.solver.pop()
-
             k += 1
-            info("[BMC] > k = {}".format(k))
+            info("[BMC] > k = %d", k)
+
+            # Unroll the next `horizon` iterations in a single write when the encoded ones are exhausted
+            if k > k_encoded:
+                info("[BMC] > Unrolling of the iterations %d to %d", k_encoded + 1, k_encoded + horizon)
+                self.solver.write_batch(self.smtlib_unrolling(k_encoded + 1, k_encoded + horizon))
+                k_encoded += horizon
+                horizon *= 2
+
+            if self.solver.check_sat_assuming(["a_{}".format(k), "t_{}".format(k)]):
+                return k
+
+    def smtlib_unrolling(self, k_start: int, k_end: int) -> Iterator[str]:
+        """ Unroll the iterations from k_start to k_end (included).
+
+        Note
+        ----
+        The transition relation k - 1 -> k is guarded by `t_k`, which implies `t_{k-1}`,
+        so that the iterations beyond the one being checked are disabled
+        (a dead marking would otherwise hide the earlier iterations).
+
+        Parameters
+        ----------
+        k_start : int
+            First iteration.
+        k_end : int
+            Last iteration.
+
+        Returns
+        -------
+        Iterator of str
+            Chunks in SMT-LIB format.
+        """
+        # Skip the per-iteration logs altogether when not verbose
+        verbose = getLogger().isEnabledFor(INFO)
+
+        for k in range(k_start, k_end + 1):
+            if verbose:
+                info("[BMC] > Declaration of the places from the Petri net (iteration: %d)", k)
+            yield self.ptnet.smtlib_declare_places(k)
 
-            info("[BMC] > Declaration of the places from the Petri net (iteration: {})".format(k))
-            self.solver.write(self.ptnet.smtlib_declare_places(k))
+            if verbose:
+                info("[BMC] > Transition relation: %d -> %d, guarded by t_%d", k - 1, k, k)
+            yield "(declare-const t_{} Bool)\n".format(k)
+            if k > 1:
+                yield "(assert (=> t_{} t_{}))\n".format(k, k - 1)
+            yield self.ptnet.smtlib_transition_relation(k - 1, k, guard="t_{}".format(k))
 
-            info("[BMC] > Transition relation: {} -> {}".format(k - 1, k))
-            self.solver.write(self.ptnet.smtlib_transition_relation(k - 1, k))
+            if verbose:
+                info("[BMC] > Formula to check the satisfiability, guarded by a_%d (iteration: %d)", k, k)
+            yield self.smtlib_guarded_formula(k)
 
-            info("[BMC] > Push")
-            self.solver.push()
+    def smtlib_guarded_formula(self, k: int) -> str:
+        """ Assert the formula at iteration k under a fresh activation literal.
 
-            info("[BMC] > Formula to check the satisfiability (iteration: {})".format(k))
-            self.solver.write(self.formula.smtlib(k, assertion=True))
+        Note
+        ----
+        The formula is only enforced when `a_k` is assumed by `check_sat_assuming`,
+        so no push / pop is needed between two iterations.
 
-        return k
+        Parameters
+        ----------
+        k : int
+            Iteration.
+
+        Returns
+        -------
+        str
+            SMT-LIB format.
+        """
+        return "(declare-const a_{} Bool)\n(assert (=> a_{} {}))\n".format(k, k, self.formula.smtlib(k))
@@ -26,11 +26,12 @@ __version__ = "1.0"
 
 from logging import info
 from multiprocessing import Queue
+from multiprocessing.connection import Connection
 from typing import Optional
 
 from usmpt.checkers.abstractchecker import AbstractChecker
-from usmpt.exec.utils import STOP, send_signal_pids, set_verbose
-from usmpt.interfaces.z3 import Z3
+from usmpt.exec.utils import STOP, send_signal_pids
+from usmpt.interfaces.z3 import BACKENDS, Z3
 from usmpt.ptio.verdict import Verdict
 
 
@@ -39,7 +40,7 @@ class Induction(AbstractChecker):
     Induction method.
     """
 
-    def __init__(self, ptnet, formula, verbose: bool = False, debug=False, solver_pids=None):
+    def __init__(self, ptnet, formula, verbose: bool = False, debug=False, solver_pids=None, solver_slot=0, backend='process', solver=None):
         """ Initializer.
         """
         # Initial Petri net
@@ -52,20 +53,18 @@ class Induction(AbstractChecker):
         self.verbose = verbose
 
         # SMT solver
-        self.solver = Z3(debug=debug, solver_pids=solver_pids)
+        self.solver = solver if solver is not None else BACKENDS[backend](debug=debug, solver_pids=solver_pids, solver_slot=solver_slot)
 
-    def prove(self, result: Queue[Verdict], concurrent_pids: Queue[list[int]]):
+    def prove(self, result: Connection, concurrent_pids: Queue[list[int]]):
         """ Prover.
 
         Parameters
         ----------
-        result : Queue of Verdict
-            Queue to exchange the verdict.
+        result : Connection
+            Connection to send the verdict.
         concurrent_pids : Queue of int
             Queue to get the PIDs of the concurrent methods.
         """
-        set_verbose(self.verbose)
-
         info("[INDUCTION] RUNNING")
 
         induction = self.prove_helper()
@@ -77,13 +76,13 @@ class Induction(AbstractChecker):
         if self.solver.aborted:
             return
 
-        # Put the result in the queue
+        # Send the result
         if induction is True:
-            result.put(Verdict.REACHABLE)
+            result.send(Verdict.REACHABLE)
         elif induction is False:
-            result.put(Verdict.NOT_REACHABLE)
+            result.send(Verdict.NOT_REACHABLE)
         elif induction is None:
-            result.put(Verdict.UNKNOWN)
+            result.send(Verdict.UNKNOWN)
 
         # Terminate concurrent methods
         if induction is None and not concurrent_pids.empty():
@@ -31,13 +31,14 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
+from ctypes import Array, c_int, c_longlong
 from logging import info
 from multiprocessing import Queue
+from multiprocessing.connection import Connection
 from typing import Optional
 
 from usmpt.checkers.abstractchecker import AbstractChecker
-from usmpt.exec.utils import set_verbose
-from usmpt.interfaces.z3 import Z3
+from usmpt.interfaces.z3 import BACKENDS, Z3
 from usmpt.ptio.formula import Formula
 from usmpt.ptio.ptnet import PetriNet
 from usmpt.ptio.verdict import Verdict
@@ -52,13 +53,13 @@ class KInduction(AbstractChecker):
         Initial Petri net.
     formula : Formula
         Reachability formula.
-    induction_queue : Queue of int, optional
-        Queue for the exchange with BMC.
+    induction_iteration : shared c_longlong, optional
+        Iteration shared with BMC (-1 while unknown).
     solver : Z3
         SMT solver (Z3).
     """
 
-    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, induction_queue: Optional[Queue[int]] = None, solver_pids: Optional[Queue[int]] = None) -> None:
+    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, induction_iteration: Optional[c_longlong] = None, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0, backend: str = 'process', solver: Optional[Z3] = None) -> None:
         """ Initializer.
 
         Parameters
@@ -69,10 +70,16 @@ class KInduction(AbstractChecker):
             Reachability formula.
         debug : bool, optional
             Debugging flag.
-        induction_queue : Queue of int, optional
-            Queue for the exchange with k-induction.
-        solver_pids : Queue of int, optional
-            Queue to share the current PID.
+        induction_iteration : shared c_longlong, optional
+            Iteration shared between BMC and k-induction (-1 while unknown).
+        solver_pids : shared Array of int, optional
+            Shared array of solver pids.
+        solver_slot : int, optional
+            Slot of the solver pid.
+        backend : str, optional
+            z3 backend (see `BACKENDS`).
+        solver : Z3, optional
+            Solver already started (e.g. acquired from a `Z3Pool`), instead of a new one.
         """
         # Initial Petri net
         self.ptnet: PetriNet = ptnet
@@ -83,30 +90,28 @@ class KInduction(AbstractChecker):
         # Verbosity
         self.verbose : bool = verbose
 
-        # Queue shared with BMC
-        self.induction_queue: Optional[Queue[int]] = induction_queue
+        # Iteration shared with BMC
+        self.induction_iteration: Optional[c_longlong] = induction_iteration
 
         # SMT solver
-        self.solver: Z3 = Z3(debug=debug, solver_pids=solver_pids)
+        self.solver: Z3 = solver if solver is not None else BACKENDS[backend](debug=debug, solver_pids=solver_pids, solver_slot=solver_slot)
 
-    def prove(self, result: Queue[Verdict], concurrent_pids: Queue[list[int]]) -> None:
+    def prove(self, result: Connection, concurrent_pids: Queue[list[int]]) -> None:
         """ Prover.
 
         Parameters
         ----------
-        result : Queue of Verdict
+        result : Connection
             Not used.
         concurrent_pids : Queue of int
             Not used.
         """
-        set_verbose(self.verbose)
-
         info("[K-INDUCTION] RUNNING")
 
         iteration = self.prove_helper()
 
-        if not self.solver.aborted and self.induction_queue is not None:
-            self.induction_queue.put(iteration)
+        if not self.solver.aborted and self.induction_iteration is not None:
+            self.induction_iteration.value = iteration
 
         # Kill the solver
         self.solver.kill()
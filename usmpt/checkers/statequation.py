@@ -24,13 +24,15 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
+from ctypes import Array, c_int
 from logging import info
 from multiprocessing import Queue
+from multiprocessing.connection import Connection
 from typing import Optional
 
 from usmpt.checkers.abstractchecker import AbstractChecker
-from usmpt.exec.utils import STOP, send_signal_pids, set_verbose
-from usmpt.interfaces.z3 import Z3
+from usmpt.exec.utils import STOP, send_signal_pids
+from usmpt.interfaces.z3 import BACKENDS, Z3
 from usmpt.ptio.formula import Formula
 from usmpt.ptio.ptnet import PetriNet
 from usmpt.ptio.verdict import Verdict
@@ -53,11 +55,11 @@ class StateEquation(AbstractChecker):
         SMT solver (Z3).
     debug : bool
         Debugging flag.
-    solver_pids : Queue of int, optional
-        Queue to share the current PID.
+    solver_pids : shared Array of int, optional
+        Shared array of solver pids.
     """
 
-    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, solver_pids: Optional[Queue[int]] = None):
+    def __init__(self, ptnet: PetriNet, formula: Formula, verbose: bool = False, debug: bool = False, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0, backend: str = 'process', solver: Optional[Z3] = None):
         """ Initializer.
         """
         # Initial Petri net
@@ -70,22 +72,20 @@ class StateEquation(AbstractChecker):
         self.verbose = verbose
 
         # SMT solver
-        self.solver: Z3 = Z3(debug=debug, solver_pids=solver_pids)
+        self.solver: Z3 = solver if solver is not None else BACKENDS[backend](debug=debug, solver_pids=solver_pids, solver_slot=solver_slot)
         self.debug: bool = debug
-        self.solver_pids: Optional[Queue[int]] = solver_pids
+        self.solver_pids: Optional[Array[c_int]] = solver_pids
 
-    def prove(self, result: Queue[Verdict], concurrent_pids: Queue[list[int]]):
+    def prove(self, result: Connection, concurrent_pids: Queue[list[int]]):
         """ Prover.
 
         Parameters
         ----------
-        result : Queue of Verdict
-            Queue to exchange the verdict.
+        result : Connection
+            Connection to send the verdict.
         concurrent_pids : Queue of int
             Queue to get the PIDs of the concurrent methods.
         """
-        set_verbose(self.verbose)
-
         info("[STATE-EQUATION] RUNNING")
 
         verdict = self.prove_helper()
@@ -97,11 +97,11 @@ class StateEquation(AbstractChecker):
         if self.solver.aborted:
             return
 
-        # Put the result in the queue
+        # Send the result
         if verdict is False:
-            result.put(Verdict.NOT_REACHABLE)
+            result.send(Verdict.NOT_REACHABLE)
         else:
-            result.put(Verdict.UNKNOWN)
+            result.send(Verdict.UNKNOWN)
 
         # Terminate concurrent methods
         if verdict is False and not concurrent_pids.empty():
@@ -24,7 +24,12 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
-from multiprocessing import Process, Queue
+from ctypes import Array, c_int, c_longlong
+from importlib import import_module
+from logging import warning
+from multiprocessing import Array as SharedArray, Pipe, Process, Queue, Value, set_start_method
+from multiprocessing.connection import Connection, wait
+from os import name
 from time import time
 from typing import Optional
 
@@ -32,11 +37,17 @@ from usmpt.checkers.bmc import BMC
 from usmpt.checkers.induction import Induction
 from usmpt.checkers.kinduction import KInduction
 from usmpt.checkers.statequation import StateEquation
-from usmpt.exec.utils import KILL, send_signal_group_pid, send_signal_pids
+from usmpt.exec.utils import KILL, send_signal_group, send_signal_pids, set_process_group, set_verbose
+from usmpt.interfaces.solver import SolverAborted
+from usmpt.interfaces.z3 import Z3, Z3Pool
 from usmpt.ptio.formula import Formula
 from usmpt.ptio.ptnet import PetriNet
 from usmpt.ptio.verdict import Verdict
 
+# Fork the methods (POSIX), they inherit the parsed query and the imported modules
+if name != 'nt':
+    set_start_method('fork', force=True)
+
 
 class Parallelizer:
     """ Helper to manage methods in parallel.
@@ -51,13 +62,21 @@ class Parallelizer:
         List of methods to be run in parallel.
     processes : list of Process
         List of processes corresponding to the methods.
-    results : list of Queue of tuple of Verdict, Marking
-        List of Queue to store the verdicts corresponding to the methods.
-    solver_pids : Queue of int
-        Queue of solver pids.
+    results : list of tuple of Connection, Connection
+        List of pipes (receiving and sending ends) to exchange the verdicts corresponding to the methods.
+    solver_pids : shared Array of int
+        Solver pids, one slot per method (0 while unknown).
+    precomputed : dict of str: str
+        SMT-LIB encodings of the initial iteration, shared by the methods.
+    group_pid : int, optional
+        Process group of the methods (and their solvers), led by the first method.
+    pool : Z3Pool, optional
+        Pool of z3 processes started beforehand (process backend only).
+    solvers : dict of str: Z3
+        Solvers acquired from the pool for each method.
     """
 
-    def __init__(self, ptnet: PetriNet, formula: Formula, methods: list[str], verbose: bool = False, debug: bool = False):
+    def __init__(self, ptnet: PetriNet, formula: Formula, methods: list[str], verbose: bool = False, debug: bool = False, backend: str = 'process'):
         """ Initializer.
 
         Parameters
@@ -70,6 +89,8 @@ class Parallelizer:
             List of methods to be run in parallel.
         debug : bool, optional
             Debugging flag.
+        backend : str, optional
+            z3 backend (see `BACKENDS`).
         """
         # Query: Petri net and formula
         self.ptnet: PetriNet = ptnet
@@ -78,7 +99,17 @@ class Parallelizer:
         # Flags
         self.verbose: bool = verbose
         self.debug: bool = debug
-        
+
+        # Configure the logging once, methods inherit it when forked
+        set_verbose(verbose)
+
+        # Solver backend
+        self.backend: str = backend
+
+        # Load the z3 bindings once, methods inherit them when forked
+        if backend == 'bindings':
+            import_module('z3')
+
         # Methods to run
         self.methods: list[str] = methods
         if 'K-INDUCTION' in methods and 'BMC' not in methods:
@@ -86,17 +117,42 @@ class Parallelizer:
 
         # Process information
         self.processes: list[Process] = []
+        self.group_pid: Optional[int] = None
 
-        # Create queues to store the results
-        self.results: list[Queue[Verdict]] = [Queue() for _ in methods]
+        # Create pipes to exchange the results
+        self.results: list[tuple[Connection, Connection]] = [Pipe(duplex=False) for _ in methods]
 
-        # Create queue to store solver pids
-        self.solver_pids: Queue[int] = Queue()
+        # Create a shared array to store the solver pids (one slot per method, single writer, no lock needed)
+        self.solver_pids: Array[c_int] = SharedArray(c_int, len(self.methods), lock=False)
 
-        # If k-induction enabled create a queue to store the current iteration of BMC
-        self.induction_queue: Optional[Queue[int]] = None
+        # If k-induction enabled create a shared integer to store the iteration found by k-induction
+        # (single writer, no lock needed to read or write it)
+        self.induction_iteration: Optional[c_longlong] = None
         if 'K-INDUCTION' in methods:
-            self.induction_queue = Queue()
+            self.induction_iteration = Value('q', -1, lock=False)
+
+        # Start the z3 processes while the methods are being set up, methods inherit them when forked
+        self.pool: Optional[Z3Pool] = None
+        self.solvers: dict[str, Z3] = {}
+        if backend == 'process' and name != 'nt' and self.methods:
+            try:
+                self.pool = Z3Pool(len(self.methods), debug=debug)
+            except SolverAborted as error:
+                warning(error)
+            else:
+                for slot, method in enumerate(self.methods):
+                    self.solvers[method] = self.pool.acquire()
+                    self.solver_pids[slot] = self.solvers[method].solver.pid
+
+        # Encode the initial iteration once, methods inherit it when forked
+        # (an encoding not implemented is left to the method, so that only it fails)
+        self.precomputed: dict[str, str] = {}
+        if 'BMC' in self.methods:
+            try:
+                self.precomputed['declare_places'] = ptnet.smtlib_declare_places(0)
+                self.precomputed['initial_marking'] = ptnet.smtlib_set_initial_marking(0)
+            except NotImplementedError:
+                pass
 
     def __getstate__(self):
         # Capture what is normally pickled
@@ -104,24 +160,35 @@ class Parallelizer:
 
         # Remove unpicklable variable 
         state['processes'] = None
+        state['pool'], state['solvers'] = None, {}
         return state
 
     def prove(self, method, result, concurrent_pids):
         """ Instantiate methods.
         """
-        if method == 'INDUCTION':
-            prover = Induction(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, solver_pids=self.solver_pids)
+        # Join the process group of the methods (or create it for the first method)
+        set_process_group(0, self.group_pid or 0)
+
+        # Slot of the solver pid
+        slot = self.methods.index(method)
+
+        try:
+            if method == 'INDUCTION':
+                prover = Induction(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, solver_pids=self.solver_pids, solver_slot=slot, backend=self.backend, solver=self.solvers.get(method))
 
-        if method == 'BMC':
-            prover = BMC(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, induction_queue=self.induction_queue, solver_pids=self.solver_pids)
+            if method == 'BMC':
+                prover = BMC(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, induction_iteration=self.induction_iteration, solver_pids=self.solver_pids, solver_slot=slot, backend=self.backend, precomputed=self.precomputed, solver=self.solvers.get(method))
 
-        if method == 'K-INDUCTION':
-            prover = KInduction(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, induction_queue=self.induction_queue)
+            if method == 'K-INDUCTION':
+                prover = KInduction(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, induction_iteration=self.induction_iteration, backend=self.backend, solver=self.solvers.get(method))
 
-        if method == 'STATE-EQUATION':
-            prover = StateEquation(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, solver_pids=self.solver_pids)
+            if method == 'STATE-EQUATION':
+                prover = StateEquation(self.ptnet, self.formula, verbose=self.verbose, debug=self.debug, solver_pids=self.solver_pids, solver_slot=slot, backend=self.backend, solver=self.solvers.get(method))
 
-        prover.prove(result, concurrent_pids=concurrent_pids)
+            prover.prove(result, concurrent_pids=concurrent_pids)
+        except SolverAborted as error:
+            # The method stops without verdict
+            warning(error)
 
     def run(self, timeout=225) -> None:
         """ Run analysis in parallel.
@@ -139,7 +206,7 @@ class Parallelizer:
         concurrent_pids: Queue[list[int]] = Queue()
 
         # Create processes
-        self.processes = [Process(target=self.prove, args=(method, result, concurrent_pids,)) for method, result in zip(self.methods, self.results)]
+        self.processes = [Process(target=self.prove, args=(method, sender, concurrent_pids,)) for method, (_, sender) in zip(self.methods, self.results)]
 
         # Start processes
         pids = []
@@ -147,6 +214,11 @@ class Parallelizer:
             proc.start()
             if proc.pid is not None:
                 pids.append(proc.pid)
+
+                # Also set the group from the parent, whichever process runs first
+                if self.group_pid is None:
+                    self.group_pid = proc.pid
+                set_process_group(proc.pid, self.group_pid)
         concurrent_pids.put(pids)
 
         self.handle(timeout)
@@ -159,27 +231,45 @@ class Parallelizer:
         timeout : int
             Time limit.
         """
-        # Get the starting time
-        start_time = time()
+        # Get the deadline
+        deadline = time() + timeout
+
+        # Wait for the verdicts and the termination of the methods,
+        # reacting to the first method that finishes
+        receivers = [receiver for receiver, _ in self.results]
+        sentinels = [proc.sentinel for proc in self.processes]
+        verdict = None
+
+        while sentinels:
+            ready = wait(receivers + sentinels, timeout=max(0, deadline - time()))
 
-        # Join processes
-        # Wait for the first process
-        self.processes[0].join(timeout=timeout)
-        # Wait for the other processes (in case of aborted method)
-        if len(self.processes) > 1:
-            for proc in self.processes[1:]:
-                proc.join(timeout=timeout - (time() - start_time))
+            # Timeout reached
+            if not ready:
+                break
 
-        # Return result data if one method finished
-        for result_method in self.results:
-            if not result_method.empty():
+            for obj in ready:
+                if obj in sentinels:
+                    sentinels.remove(obj)
+                    continue
 
-                verdict = result_method.get()
-                print("FORMULA " + self.formula.result(verdict))
+                receivers.remove(obj)
+                verdict = obj.recv()
 
-                self.stop()
+                # Return result data as soon as one method concludes
+                if verdict != Verdict.UNKNOWN:
+                    print("FORMULA " + self.formula.result(verdict))
+                    self.stop()
+                    return None
 
-        # Otherwise stop the methods
+        # Collect the verdicts sent by terminated methods
+        for receiver in receivers:
+            if receiver.poll():
+                verdict = receiver.recv()
+
+        if verdict is not None:
+            print("FORMULA " + self.formula.result(verdict))
+
+        # Stop the methods
         self.stop()
 
         return None
@@ -187,9 +277,11 @@ class Parallelizer:
     def stop(self) -> None:
         """ Stop the methods.
         """
-        # Kill methods
-        send_signal_pids([proc.pid for proc in self.processes if proc.pid is not None], KILL)
-
-        # Kill solvers
-        while not self.solver_pids.empty():
-            send_signal_group_pid(self.solver_pids.get(), KILL)
+        # Kill methods (and their solvers) at once when they share a process group
+        if self.group_pid is not None and name != 'nt':
+            send_signal_group(self.group_pid, KILL)
+        else:
+            send_signal_pids([proc.pid for proc in self.processes if proc.pid is not None], KILL)
+
+        # Kill solvers (the ones started beforehand are not in the process group of the methods)
+        send_signal_pids([pid for pid in self.solver_pids if pid], KILL)
@@ -31,6 +31,18 @@ import logging as log
 STOP = signal.SIGTERM
 KILL = signal.SIGTERM if os.name == 'nt' else signal.SIGKILL
 
+# Current pid, refreshed in forked children (the methods are started with fork)
+_CURRENT_PID = os.getpid()
+
+
+def _refresh_current_pid() -> None:
+    global _CURRENT_PID
+    _CURRENT_PID = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_refresh_current_pid)
+
 
 def send_signal_pids(pids: list[int], signal_to_send: signal.Signals):
     """ Send a signal to a list of processes
@@ -43,34 +55,51 @@ def send_signal_pids(pids: list[int], signal_to_send: signal.Signals):
     signal_to_send : Signals
         Signal to send.
     """
-    current_pid = os.getpid()
-
-    for pid in pids:
-        # Do not send a signal to the current process
-        if pid == current_pid:
-            continue
+    # Do not send a signal to the current process
+    targets = set(pids) - {_CURRENT_PID}
 
+    for pid in targets:
         try:
             os.kill(pid, signal_to_send)
         except OSError:
             pass
 
 
-def send_signal_group_pid(pid: int, signal_to_send: signal.Signals):
-    """ Send a signal to the group pid of a given process.
- 
+def send_signal_group(group_pid: int, signal_to_send: signal.Signals):
+    """ Send a signal to a process group.
+
     Parameters
     ----------
-    pid : int
-        Process.
+    group_pid : int
+        Process group.
     signal_to_send : Signals
         Signal to send.
     """
     try:
-        os.killpg(os.getpgid(pid), signal_to_send)
+        os.killpg(group_pid, signal_to_send)
     except ProcessLookupError:
         pass
 
+
+def set_process_group(pid: int, group_pid: int) -> None:
+    """ Move a process to a process group (no-op on Windows).
+
+    Parameters
+    ----------
+    pid : int
+        Process (0 for the current process).
+    group_pid : int
+        Process group (0 for a new group led by the process).
+    """
+    if os.name == 'nt':
+        return
+
+    try:
+        os.setpgid(pid, group_pid)
+    except OSError:
+        pass
+
+
 def set_verbose(verbose: bool) -> None:
     # Set the verbose level
     if verbose:
@@ -25,7 +25,13 @@ __license__ = "GPLv3"
 __version__ = "1.0"
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Sequence
+
+
+class SolverAborted(RuntimeError):
+    """ Raised when a solver is aborted.
+    """
+    pass
 
 
 class Solver(ABC):
@@ -43,6 +49,11 @@ class Solver(ABC):
     @abstractmethod
     def abort(self) -> None:
         """ Abort the solver.
+
+        Raises
+        ------
+        SolverAborted
+            Always, the caller decides what to do.
         """
         pass
 
@@ -76,12 +87,65 @@ class Solver(ABC):
         pass
 
     @abstractmethod
-    def check_sat(self) -> Optional[bool]:
+    def push(self) -> None:
+        """ Push.
+
+        Note
+        ----
+        Creates a new scope by saving the current stack size.
+        """
+        pass
+
+    @abstractmethod
+    def pop(self) -> None:
+        """ Pop.
+
+        Note
+        ----
+        Removes any assertion or declaration performed between it and the last push.
+        """
+        pass
+
+    @abstractmethod
+    def check_sat(self, no_check: bool = False) -> Optional[bool]:
         """ Check the satisfiability of the current stack.
 
+        Parameters
+        ----------
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
         Returns
         -------
         bool, optional
             Satisfiability of the current stack.
         """
         pass
+
+    def check_sat_assuming(self, literals: Sequence[str], no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack
+            under some assumptions.
+
+        Note
+        ----
+        Falls back to asserting the literals between a `push` and a `pop`,
+        solvers supporting `check-sat-assuming` should override it.
+
+        Parameters
+        ----------
+        literals : Sequence of str
+            Boolean literals assumed to be true.
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack under the assumptions.
+        """
+        self.push()
+        self.write(''.join("(assert {})\n".format(literal) for literal in literals))
+        sat = self.check_sat(no_check)
+        self.pop()
+
+        return sat
@@ -25,14 +25,93 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
-from logging import warning
-from multiprocessing import Queue
-from os import name
-from subprocess import PIPE, Popen
-from sys import exit
-from typing import Optional
+from atexit import register
+from io import BufferedWriter, FileIO
+import os
+from os import cpu_count, name
+from re import Match, sub
+from selectors import EVENT_READ, EVENT_WRITE, DefaultSelector
+from sys import stdout
+from time import time
+from typing import TYPE_CHECKING, Iterable, Optional, Union
 
-from usmpt.interfaces.solver import Solver
+from usmpt.exec.utils import KILL, send_signal_pids
+from usmpt.interfaces.solver import Solver, SolverAborted
+
+# Only used for annotations, or imported when needed
+if TYPE_CHECKING:
+    from ctypes import Array, c_int
+    from queue import Queue
+    from subprocess import Popen
+
+    import z3
+
+# Buffered sink of the debugging output (created lazily by each process)
+DEBUG_OUTPUT: Optional[BufferedWriter] = None
+
+
+def debug_print(output: Union[str, bytes, memoryview, object]) -> None:
+    """ Print debugging output (instructions and answers of the solvers).
+
+    Note
+    ----
+    Output is buffered, and written to the standard output by `debug_flush`
+    (before waiting for a solver, when killing it and at exit).
+
+    Parameters
+    ----------
+    output : str, bytes-like or object
+        Output to print.
+    """
+    global DEBUG_OUTPUT
+
+    if DEBUG_OUTPUT is None:
+        try:
+            fd = stdout.fileno()
+        except (AttributeError, OSError, ValueError):
+            print(output)
+            return
+        # Keep the order with what has already been printed
+        stdout.flush()
+        DEBUG_OUTPUT = BufferedWriter(FileIO(fd, 'wb', closefd=False), buffer_size=1 << 20)
+        register(debug_flush)
+
+    if not isinstance(output, (bytes, bytearray, memoryview)):
+        output = str(output).encode('utf-8')
+    DEBUG_OUTPUT.write(output)
+    DEBUG_OUTPUT.write(b'\n')
+
+
+def debug_flush() -> None:
+    """ Write the buffered debugging output.
+    """
+    if DEBUG_OUTPUT is not None:
+        DEBUG_OUTPUT.flush()
+
+
+# Encoded instructions
+PUSH = b"(push)\n"
+POP = b"(pop)\n"
+CHECK = b"(check-sat)\n"
+RESET = b"(reset)\n"
+
+# Scope markers of the transcript of a portfolio
+SCOPE_PUSH = "(push)\n"
+SCOPE_POP = "(pop)\n"
+
+
+def _reset_after_fork() -> None:
+    global DEBUG_OUTPUT
+
+    # Drop the debugging output buffered by the parent
+    DEBUG_OUTPUT = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Declarations of constants, handled apart when using the Python bindings
+DECLARATION = r"\(declare-(?:const\s+(\S+)|fun\s+(\S+)\s+\(\s*\))\s+(Int|Bool|Real)\s*\)"
 
 
 class Z3(Solver):
@@ -48,17 +127,49 @@ class Z3(Solver):
     This class can easily be hacked to replace Z3
     by another SMT solver supporting the SMT-LIB format.
 
+    The pipes are unbuffered (`bufsize=0`): instructions are only buffered in `buffer`,
+    which is always flushed before reading an answer (see `readline_bytes`).
+
     Attributes
     ----------
     solver : Popen
-        A z3 process.
+        A z3 process (unbuffered pipes).
+    stdin_fd : int, optional
+        File descriptor of the standard input of the process.
+    buffer : bytearray
+        Instructions waiting to be sent to the solver (at the next read).
+    output : bytearray
+        Reusable buffer of the output read from the solver.
+    output_view : memoryview
+        View on the output buffer.
+    output_start : int
+        Start of the output not consumed yet.
+    output_end : int
+        End of the output read.
+    selector : DefaultSelector, optional
+        Selector waiting for the standard output (created at the first read).
+    timeout : int
+        Timeout of the solver, also used as time limit to read a result.
+    pending_pushes : int
+        Number of pushes not sent yet (a push directly followed by a pop is never sent).
+    depth : int
+        Current number of scopes (including the pending pushes).
+    declarations : dict of bytes: int
+        Last declaration chunks sent, with the depth of their scope.
     aborted : bool
         Aborted flag.
     debug : bool
         Debugging flag.
     """
 
-    def __init__(self, debug: bool = False, timeout: int = 0, solver_pids: Optional[Queue] = None) -> None:
+    # Answers of a satisfiability check
+    SAT_TABLE = {b'sat': True, b'unsat': False}
+
+    # Maximum number (and size) of the declaration chunks remembered to skip duplicates
+    MAX_DECLARATIONS = 1024
+    MAX_DECLARATION_SIZE = 4096
+
+    def __init__(self, debug: bool = False, timeout: int = 0, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0, options: Optional[list[str]] = None, process: Optional[Popen] = None) -> None:
         """ Initializer.
 
         Parameters
@@ -67,37 +178,169 @@ class Z3(Solver):
             Debugging flag.
         timeout : int, optional
             Timeout of the solver.
-        solver_pids : Queue of int, optional
-            Queue of solver pids.
+        solver_pids : shared Array of int, optional
+            Shared array of solver pids (one slot per method).
+        solver_slot : int, optional
+            Slot of the solver pid.
+        options : list of str, optional
+            Options of the solver (e.g. `smt.random_seed=1`).
+        process : Popen, optional
+            z3 process already started (with unbuffered pipes), instead of a new one.
         """
         # Solver
+        if process is not None:
+            self.solver: Popen = process
+        else:
+            self.solver = self.start(timeout, options)
+
+        if solver_pids is not None:
+            solver_pids[solver_slot] = self.solver.pid
+
+        # Raw file descriptor of the standard input
+        self.stdin_fd: Optional[int] = self.solver.stdin.fileno() if self.solver.stdin is not None else None
+
+        # Non-blocking standard output, waited with a selector (to enforce the timeout on the Python side)
+        if self.solver.stdout is not None and name != 'nt':
+            os.set_blocking(self.solver.stdout.fileno(), False)
+
+        # Pending instructions, and output not read yet
+        self.buffer: bytearray = bytearray()
+        self.output: bytearray = bytearray(4096)
+        self.output_view: memoryview = memoryview(self.output)
+        self.output_start: int = 0
+        self.output_end: int = 0
+        self.selector: Optional[DefaultSelector] = None
+
+        # Time limit to read a result (seconds)
+        self.timeout: int = timeout
+
+        # Scopes and declarations sent
+        self.pending_pushes: int = 0
+        self.depth: int = 0
+        self.declarations: dict[bytes, int] = {}
+
+        # Flags
+        self.aborted: bool = False
+        self.debug: bool = debug
+
+    @staticmethod
+    def start(timeout: int = 0, options: Optional[list[str]] = None) -> Popen:
+        """ Start a z3 process.
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Timeout of the solver.
+        options : list of str, optional
+            Options of the solver.
+
+        Returns
+        -------
+        Popen
+            A z3 process.
+
+        Raises
+        ------
+        SolverAborted
+            If z3 cannot be started.
+        """
         if name == 'nt':
             process = ['z3.exe', '-in']
         else:
             process = ['z3', '-in']
         if timeout:
             process.append('-T:{}'.format(timeout))
-        self.solver: Popen = Popen(' '.join(process), stdin=PIPE, stdout=PIPE, shell=True)
+        if options:
+            process.extend(options)
 
-        if solver_pids is not None:
-            solver_pids.put(self.solver.pid)
+        from subprocess import PIPE, Popen
 
-        # Flags
-        self.aborted: bool = False
-        self.debug: bool = debug
+        # Unbuffered pipes, the buffering is done once by `buffer` (flushed before each read)
+        try:
+            return Popen(process, stdin=PIPE, stdout=PIPE, bufsize=0, close_fds=name != 'nt')
+        except OSError:
+            raise SolverAborted("z3 process cannot be started")
+
+    @classmethod
+    def warm_spawn(cls, n: int, debug: bool = False, timeout: int = 0) -> list[Z3]:
+        """ Start several solvers at once.
+
+        Note
+        ----
+        All the processes are started before initializing the first solver,
+        so that they boot concurrently.
+
+        Parameters
+        ----------
+        n : int
+            Number of solvers.
+        debug : bool, optional
+            Debugging flag.
+        timeout : int, optional
+            Timeout of the solvers.
+
+        Returns
+        -------
+        list of Z3
+            Solvers.
+        """
+        processes = [cls.start(timeout) for _ in range(n)]
+
+        return [cls(debug=debug, timeout=timeout, process=process) for process in processes]
+
+    def reuse(self) -> bool:
+        """ Get a clean solver without starting a new process.
+
+        Note
+        ----
+        Resetting is the canonical way to get a clean state,
+        `(reset)` costs far less than starting z3 again.
+
+        Returns
+        -------
+        bool
+            False if the process is not running anymore (a new solver must be started).
+        """
+        if self.solver.poll() is not None:
+            return False
+
+        self.reset()
+        self.aborted = False
+
+        return True
+
+    def __del__(self) -> None:
+        # Only terminate the process if it is still running (and started by the current process)
+        solver = getattr(self, 'solver', None)
+        if solver is not None and solver.poll() is None:
+            self.kill()
 
     def kill(self) -> None:
         """" Kill the process.
+
+        Note
+        ----
+        The process may have been started by the parent (see `Z3Pool`),
+        so it is killed by pid rather than with `Popen.kill`, which requires to be its parent.
         """
-        self.solver.kill()
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+
+        send_signal_pids([self.solver.pid], KILL)
+        debug_flush()
 
     def abort(self) -> None:
         """ Abort the solver.
+
+        Raises
+        ------
+        SolverAborted
+            Always.
         """
-        warning("z3 process has been aborted")
-        self.solver.kill()
+        self.kill()
         self.aborted = True
-        exit()
+        raise SolverAborted("z3 process has been aborted")
 
     def write(self, input: str, debug: bool = False) -> None:
         """ Write instructions to the standard input.
@@ -109,63 +352,236 @@ class Z3(Solver):
         debug : bool
             Debugging flag.
         """
+        self.write_bytes(input.encode('utf-8'), debug=debug)
+
+    def write_bytes(self, input: bytes, debug: bool = False) -> None:
+        """ Write instructions already encoded in UTF-8.
+
+        Note
+        ----
+        Chunks of declarations identical to a (small) one already sent in the current scopes are skipped.
+
+        Parameters
+        ----------
+        input : bytes
+            Input instructions.
+        debug : bool
+            Debugging flag.
+        """
+        if input.startswith(b"(declare-") and len(input) <= self.MAX_DECLARATION_SIZE:
+            if input in self.declarations:
+                return
+            self.declarations[input] = self.depth
+            if len(self.declarations) > self.MAX_DECLARATIONS:
+                del self.declarations[next(iter(self.declarations))]
+
+        if self.pending_pushes:
+            self.buffer += PUSH * self.pending_pushes
+            if self.debug:
+                debug_print(PUSH * self.pending_pushes)
+            self.pending_pushes = 0
+
         if self.debug or debug:
-            print(input)
+            debug_print(input)
+
+        self.buffer += input
+
+    def write_batch(self, chunks: Iterable[str], debug: bool = False) -> None:
+        """ Write several chunks of instructions at once.
+
+        Note
+        ----
+        Instructions are buffered, and sent to the solver by `flush`.
+
+        Parameters
+        ----------
+        chunks : Iterable of str
+            Chunks of input instructions.
+        debug : bool
+            Debugging flag.
+        """
+        for chunk in chunks:
+            if chunk:
+                self.write_bytes(chunk.encode('utf-8'), debug=debug)
+
+    def write_all(self, fd: int, data: memoryview) -> None:
+        """ Write data to a file descriptor, bypassing the Python I/O stack.
+
+        Note
+        ----
+        Handles short writes, interrupted writes (`EINTR`) and full pipes
+        in non-blocking mode (`EAGAIN`). Only `BrokenPipeError` is raised.
 
-        if input != "":
+        Parameters
+        ----------
+        fd : int
+            File descriptor.
+        data : memoryview
+            Data to write.
+        """
+        while data:
             try:
-                if self.solver.stdin is None:
-                    self.abort()
-                else:
-                    self.solver.stdin.write(bytes(input, 'utf-8'))
-            except BrokenPipeError:
-                self.abort()
+                data = data[os.write(fd, data):]
+            except InterruptedError:
+                continue
+            except BlockingIOError:
+                # Wait until the solver has consumed some input
+                with DefaultSelector() as selector:
+                    selector.register(fd, EVENT_WRITE)
+                    selector.select()
 
     def flush(self) -> None:
-        """ Flush the standard input.
+        """ Send the pending instructions to the standard input.
         """
         try:
-            if self.solver.stdin is None:
+            if self.stdin_fd is None or self.solver.stdin is None:
                 self.abort()
-            else:
-                self.solver.stdin.flush()
+            elif self.buffer:
+                if name == 'nt':
+                    self.solver.stdin.write(self.buffer)
+                    self.solver.stdin.flush()
+                else:
+                    with memoryview(self.buffer) as view:
+                        self.write_all(self.stdin_fd, view)
+                self.buffer.clear()
         except BrokenPipeError:
             self.abort()
 
-    def readline(self, debug: bool = False):
+    def readline(self, debug: bool = False, timeout: Optional[float] = None):
         """ Read a line from the standard output.
 
+        Note
+        ----
+        The solver is killed if no line is read before the timeout (see `read_output`).
+
         Parameters
         ----------
         debug : bool, optional
             Debugging flag.
+        timeout : float, optional
+            Time limit in seconds (no limit by default).
 
         Returns
         -------
         str
             Line read.
         """
+        return str(self.readline_bytes(debug, timeout), 'utf-8').strip()
+
+    def readline_bytes(self, debug: bool = False, timeout: Optional[float] = None) -> Union[bytes, memoryview]:
+        """ Read a raw line from the standard output (see `readline`).
+
+        Parameters
+        ----------
+        debug : bool, optional
+            Debugging flag.
+        timeout : float, optional
+            Time limit in seconds (no limit by default).
+
+        Returns
+        -------
+        bytes or memoryview
+            Line read (not decoded), only valid until the next read.
+        """
+        self.flush()
+        debug_flush()
+
+        smt_output = b''
         try:
             if self.solver.stdout is None:
                 self.abort()
+            elif name == 'nt':
+                smt_output = self.solver.stdout.readline().rstrip()
             else:
-                smt_output = self.solver.stdout.readline().decode('utf-8').strip()
+                smt_output = self.read_output(self.solver.stdout.fileno(), timeout)
         except BrokenPipeError:
             self.abort()
 
         if self.debug or debug:
-            print(smt_output)
+            debug_print(smt_output)
+            debug_flush()
 
         return smt_output
 
+    def read_output(self, fd: int, timeout: Optional[float] = None) -> memoryview:
+        """ Read a line from the standard output (of file descriptor `fd`),
+            waiting with the selector of the solver.
+
+        Note
+        ----
+        The output is read into a reusable buffer, the line returned is a view on it
+        that is only valid until the next read.
+
+        Parameters
+        ----------
+        fd : int
+            File descriptor.
+        timeout : float, optional
+            Time limit in seconds (no limit by default).
+
+        Returns
+        -------
+        memoryview
+            Line read (without the line feed).
+
+        Raises
+        ------
+        SolverAborted
+            If the time limit is reached (the solver is killed).
+        """
+        deadline = None if timeout is None else time() + timeout
+
+        # Created lazily, so that the solvers started before a fork are waited by the process reading them
+        if self.selector is None:
+            self.selector = DefaultSelector()
+            self.selector.register(fd, EVENT_READ)
+
+        while (end := self.output.find(b'\n', self.output_start, self.output_end)) < 0:
+            # Move the partial line to the beginning of the buffer, or grow the buffer if it is full
+            length = self.output_end - self.output_start
+            if self.output_start:
+                self.output[:length] = self.output[self.output_start:self.output_end]
+            elif length == len(self.output):
+                self.output = self.output + bytearray(length)
+                self.output_view = memoryview(self.output)
+            self.output_start, self.output_end = 0, length
+
+            remaining = None if deadline is None else max(0, deadline - time())
+            if not self.selector.select(remaining):
+                if deadline is not None and time() >= deadline:
+                    self.kill()
+                    self.aborted = True
+                    raise SolverAborted("z3 process has timed out")
+                continue
+
+            # Non-blocking reads: nothing to read yet (None) or end of file (0)
+            try:
+                size = self.solver.stdout.readinto(self.output_view[self.output_end:])
+            except InterruptedError:
+                continue
+            if size is None:
+                continue
+            if not size:
+                raise BrokenPipeError
+            self.output_end += size
+
+        line = self.output_view[self.output_start:end]
+        self.output_start = end + 1
+
+        return line
+
     def reset(self) -> None:
         """ Reset.
 
         Note
         ----
         Erase all assertions and declarations.
+        Prefer it (or `reuse`) to starting a new solver to get a clean state.
         """
-        self.write("(reset)\n")
+        self.pending_pushes, self.depth = 0, 0
+        self.declarations.clear()
+
+        self.write_bytes(RESET)
 
     def push(self):
         """ Push.
@@ -173,8 +589,10 @@ class Z3(Solver):
         Note
         ----
         Creates a new scope by saving the current stack size.
+        The push is only sent with the next instructions.
         """
-        self.write("(push)\n")
+        self.pending_pushes += 1
+        self.depth += 1
 
     def pop(self) -> None:
         """ Pop.
@@ -183,7 +601,16 @@ class Z3(Solver):
         ----
         Removes any assertion or declaration performed between it and the last push.
         """
-        self.write("(pop)\n")
+        self.depth -= 1
+
+        # Forget the declarations of the scope
+        for declaration in [declaration for declaration, depth in self.declarations.items() if depth > self.depth]:
+            del self.declarations[declaration]
+
+        if self.pending_pushes:
+            self.pending_pushes -= 1
+        else:
+            self.write_bytes(POP)
 
     def check_sat(self, no_check: bool = False) -> Optional[bool]:
         """ Check the satisfiability of the current stack of z3.
@@ -198,16 +625,746 @@ class Z3(Solver):
         bool, optional
             Satisfiability of the current stack.
         """
-        self.write("(check-sat)\n")
-        self.flush()
+        self.write_bytes(CHECK)
 
-        sat = self.readline()
+        return self.read_sat(no_check)
 
-        if sat == 'sat':
-            return True
-        elif sat == 'unsat':
-            return False
-        elif not no_check:
+    def check_sat_assuming(self, literals: list[str], no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack of z3
+            under some assumptions.
+
+        Note
+        ----
+        Contrary to `push` / `pop`, assumptions do not force z3
+        to throw away the lemmas learned between two checks.
+
+        Parameters
+        ----------
+        literals : list of str
+            Boolean literals assumed to be true.
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack under the assumptions.
+        """
+        self.write_bytes("(check-sat-assuming ({}))\n".format(' '.join(literals)).encode('utf-8'))
+
+        return self.read_sat(no_check)
+
+    def read_sat(self, no_check: bool = False) -> Optional[bool]:
+        """ Read the result of a satisfiability check.
+
+        Parameters
+        ----------
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability returned by z3.
+        """
+        # Single lookup (`unknown`, `timeout` or an error are not in the table)
+        sat = self.SAT_TABLE.get(bytes(self.readline_bytes(timeout=self.timeout or None)))
+
+        if sat is None and not no_check:
             self.abort()
 
-        return None
+        return sat
+
+
+class Z3InProcess(Solver):
+    """ z3 interface using the Python bindings.
+
+    Note
+    ----
+    Exposes the same SMT-LIB interface as `Z3`, but instructions are handed
+    over to the z3 library within the current process instead of being
+    written to the standard input of a z3 process.
+
+    Dependency: https://pypi.org/project/z3-solver/
+
+    Declarations are kept on the Python side, so that the instructions
+    written at different times can refer to the same constants.
+
+    Attributes
+    ----------
+    context : z3.Context
+        A z3 context, owned by the solver.
+    solver : z3.Solver
+        A z3 solver.
+    parsed : dict of str: z3.AstVector
+        Cache of the parsed instructions.
+    declarations : dict of str: z3.ExprRef
+        Constants declared in the current scope.
+    scopes : list of dict of str: z3.ExprRef
+        Declarations saved at each push.
+    result : z3.CheckSatResult, optional
+        Result of the last satisfiability check.
+    aborted : bool
+        Aborted flag.
+    debug : bool
+        Debugging flag.
+    """
+
+    def __init__(self, debug: bool = False, timeout: int = 0, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0) -> None:
+        """ Initializer.
+
+        Parameters
+        ----------
+        debug : bool, optional
+            Debugging flag.
+        timeout : int, optional
+            Timeout of the solver.
+        solver_pids : shared Array of int, optional
+            Not used (no solver process to kill).
+        solver_slot : int, optional
+            Not used.
+        """
+        import z3
+
+        # Solver
+        self.z3 = z3
+        self.context = z3.Context()
+        self.solver = z3.Solver(ctx=self.context)
+        if timeout:
+            self.solver.set('timeout', timeout * 1000)
+
+        self.sorts = {'Int': z3.IntSort(self.context), 'Bool': z3.BoolSort(self.context), 'Real': z3.RealSort(self.context)}
+
+        # Parsed instructions (identical constraints are parsed once)
+        self.parsed: dict = {}
+
+        # Declarations
+        self.declarations: dict = {}
+        self.scopes: list[dict] = []
+
+        self.result = None
+
+        # Flags
+        self.aborted: bool = False
+        self.debug: bool = debug
+
+    def kill(self) -> None:
+        """" Kill the process.
+
+        Note
+        ----
+        Nothing to kill, the solver lives in the current process.
+        """
+        debug_flush()
+
+    def abort(self) -> None:
+        """ Abort the solver.
+
+        Raises
+        ------
+        SolverAborted
+            Always.
+        """
+        self.aborted = True
+        raise SolverAborted("z3 solver has been aborted")
+
+    def declare(self, match: Match) -> str:
+        """ Declare a constant matched in the instructions.
+
+        Parameters
+        ----------
+        match : Match
+            Declaration matched by `DECLARATION`.
+
+        Returns
+        -------
+        str
+            Empty string (the declaration is removed from the instructions).
+        """
+        identifier = match.group(1) or match.group(2)
+        self.declarations[identifier] = self.z3.Const(identifier, self.sorts[match.group(3)])
+        return ""
+
+    def parse(self, input: str):
+        """ Parse instructions, with a cache.
+
+        Parameters
+        ----------
+        input : str
+            Input instructions.
+
+        Returns
+        -------
+        z3.AstVector
+            Assertions.
+        """
+        assertions = self.parsed.get(input)
+
+        if assertions is None:
+            # Declarations are always performed, even if the assertions are cached
+            assertions = self.z3.parse_smt2_string(sub(DECLARATION, self.declare, input), decls=self.declarations, ctx=self.context)
+            self.parsed[input] = assertions
+        else:
+            sub(DECLARATION, self.declare, input)
+
+        return assertions
+
+    def write(self, input: Union[str, z3.BoolRef], debug: bool = False) -> None:
+        """ Write instructions.
+
+        Parameters
+        ----------
+        input : str or z3.BoolRef
+            Input instructions, or an assertion already built with the bindings (in the solver context).
+        debug : bool
+            Debugging flag.
+        """
+        if self.debug or debug:
+            debug_print(input)
+
+        if not isinstance(input, str):
+            self.solver.add(input)
+        elif input != "":
+            try:
+                self.solver.add(self.parse(input))
+            except self.z3.Z3Exception:
+                self.abort()
+
+    def write_batch(self, chunks: Iterable[str], debug: bool = False) -> None:
+        """ Write several chunks of instructions at once.
+
+        Parameters
+        ----------
+        chunks : Iterable of str
+            Chunks of input instructions.
+        debug : bool
+            Debugging flag.
+        """
+        self.write(''.join(chunks), debug=debug)
+
+    def readline(self, debug: bool = False) -> str:
+        """ Read the result of the last satisfiability check.
+
+        Parameters
+        ----------
+        debug : bool, optional
+            Debugging flag.
+
+        Returns
+        -------
+        str
+            Line read.
+        """
+        smt_output = str(self.result)
+
+        if self.debug or debug:
+            debug_print(smt_output)
+
+        return smt_output
+
+    def reset(self) -> None:
+        """ Reset.
+
+        Note
+        ----
+        Erase all assertions and declarations.
+        """
+        self.solver.reset()
+        self.declarations, self.scopes = {}, []
+
+    def push(self) -> None:
+        """ Push.
+
+        Note
+        ----
+        Creates a new scope by saving the current stack size.
+        """
+        self.solver.push()
+        self.scopes.append(self.declarations.copy())
+
+    def pop(self) -> None:
+        """ Pop.
+
+        Note
+        ----
+        Removes any assertion or declaration performed between it and the last push.
+        """
+        self.solver.pop()
+        self.declarations = self.scopes.pop()
+
+    def check_sat(self, no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack of z3.
+
+        Parameters
+        ----------
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack.
+        """
+        try:
+            self.result = self.solver.check()
+        except self.z3.Z3Exception:
+            self.abort()
+
+        return self.read_sat(no_check)
+
+    def check_sat_assuming(self, literals: list[str], no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack of z3
+            under some assumptions.
+
+        Parameters
+        ----------
+        literals : list of str
+            Boolean literals assumed to be true.
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack under the assumptions.
+        """
+        try:
+            self.result = self.solver.check(*[self.declarations[literal] for literal in literals])
+        except (KeyError, self.z3.Z3Exception):
+            self.abort()
+
+        return self.read_sat(no_check)
+
+    def read_sat(self, no_check: bool = False) -> Optional[bool]:
+        """ Read the result of a satisfiability check.
+
+        Parameters
+        ----------
+        no_check : bool
+            Do not abort the solver in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability returned by z3.
+        """
+        if self.debug:
+            self.readline()
+            debug_flush()
+
+        if self.result == self.z3.sat:
+            return True
+        elif self.result == self.z3.unsat:
+            return False
+        elif not no_check:
+            self.abort()
+
+        return None
+
+
+class PortfolioZ3(Solver):
+    """ Portfolio of z3 processes with different configurations.
+
+    Note
+    ----
+    Instructions are sent to every solver, and the first definite answer
+    to a satisfiability check is kept. The solvers still running are killed,
+    and replaced by new ones replaying the instructions.
+
+    Attributes
+    ----------
+    solvers : list of Z3
+        z3 processes.
+    options : list of list of str
+        Options of each solver.
+    transcript : list of str
+        Instructions (and scopes) written since the last reset, replayed into the new solvers.
+    result : str
+        Result of the last satisfiability check.
+    aborted : bool
+        Aborted flag.
+    debug : bool
+        Debugging flag.
+    """
+
+    # Configurations of the portfolio
+    CONFIGURATIONS = [
+        [],
+        ['sat.random_seed=1', 'smt.random_seed=1'],
+        ['smt.arith.solver=2'],
+        ['smt.phase_selection=5'],
+    ]
+
+    def __init__(self, debug: bool = False, timeout: int = 0, solver_pids: Optional[Array[c_int]] = None, solver_slot: int = 0, size: int = 2) -> None:
+        """ Initializer.
+
+        Parameters
+        ----------
+        debug : bool, optional
+            Debugging flag.
+        timeout : int, optional
+            Timeout of the solvers.
+        solver_pids : shared Array of int, optional
+            Shared array of solver pids, only the pid of the first solver is recorded
+            (the others are started in the same process group).
+        solver_slot : int, optional
+            Slot of the solver pid.
+        size : int, optional
+            Number of solvers (at most the number of configurations).
+        """
+        self.timeout: int = timeout
+        self.options: list[list[str]] = self.CONFIGURATIONS[:max(1, size)]
+        self.solvers: list[Z3] = [Z3(timeout=timeout, options=options) for options in self.options]
+
+        if solver_pids is not None:
+            solver_pids[solver_slot] = self.solvers[0].solver.pid
+
+        self.transcript: list[str] = []
+        self.result: str = ""
+
+        # Flags
+        self.aborted: bool = False
+        self.debug: bool = debug
+
+    def kill(self) -> None:
+        """" Kill the processes.
+        """
+        for solver in self.solvers:
+            solver.kill()
+        debug_flush()
+
+    def abort(self) -> None:
+        """ Abort the solvers.
+
+        Raises
+        ------
+        SolverAborted
+            Always.
+        """
+        self.kill()
+        self.aborted = True
+        raise SolverAborted("z3 portfolio has been aborted")
+
+    def write(self, input: str, debug: bool = False) -> None:
+        """ Write instructions to all the solvers.
+
+        Parameters
+        ----------
+        input : str 
+            Input instructions.
+        debug : bool
+            Debugging flag.
+        """
+        self.write_batch([input], debug=debug)
+
+    def write_batch(self, chunks: Iterable[str], debug: bool = False) -> None:
+        """ Write several chunks of instructions at once to all the solvers.
+
+        Parameters
+        ----------
+        chunks : Iterable of str
+            Chunks of input instructions.
+        debug : bool
+            Debugging flag.
+        """
+        input = ''.join(chunks)
+
+        if self.debug or debug:
+            debug_print(input)
+
+        self.transcript.append(input)
+        for solver in self.solvers:
+            solver.write(input)
+
+    def readline(self, debug: bool = False) -> str:
+        """ Read the result of the last satisfiability check.
+
+        Parameters
+        ----------
+        debug : bool, optional
+            Debugging flag.
+
+        Returns
+        -------
+        str
+            Line read.
+        """
+        if self.debug or debug:
+            debug_print(self.result)
+
+        return self.result
+
+    def reset(self) -> None:
+        """ Reset.
+
+        Note
+        ----
+        Erase all assertions and declarations.
+        """
+        self.transcript = []
+        for solver in self.solvers:
+            solver.reset()
+
+    def push(self) -> None:
+        """ Push.
+
+        Note
+        ----
+        Creates a new scope by saving the current stack size.
+        """
+        if self.debug:
+            debug_print(SCOPE_PUSH)
+
+        self.transcript.append(SCOPE_PUSH)
+        for solver in self.solvers:
+            solver.push()
+
+    def pop(self) -> None:
+        """ Pop.
+
+        Note
+        ----
+        Removes any assertion or declaration performed between it and the last push.
+        """
+        if self.debug:
+            debug_print(SCOPE_POP)
+
+        self.transcript.append(SCOPE_POP)
+        for solver in self.solvers:
+            solver.pop()
+
+    def check_sat(self, no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack of the solvers.
+
+        Parameters
+        ----------
+        no_check : bool
+            Do not abort the solvers in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack.
+        """
+        return self.race(CHECK, no_check)
+
+    def check_sat_assuming(self, literals: list[str], no_check: bool = False) -> Optional[bool]:
+        """ Check the satisfiability of the current stack of the solvers
+            under some assumptions.
+
+        Parameters
+        ----------
+        literals : list of str
+            Boolean literals assumed to be true.
+        no_check : bool
+            Do not abort the solvers in case of unknown verdict.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the current stack under the assumptions.
+        """
+        return self.race("(check-sat-assuming ({}))\n".format(' '.join(literals)).encode('utf-8'), no_check)
+
+    def race(self, query: bytes, no_check: bool = False) -> Optional[bool]:
+        """ Send a satisfiability check to all the solvers and keep the first definite answer.
+
+        Parameters
+        ----------
+        query : bytes
+            Satisfiability check (encoded).
+        no_check : bool
+            Do not abort the solvers in case of unknown verdict.
+
+        Note
+        ----
+        A solver that fails (end of file, broken pipe or timeout) is dropped from the portfolio,
+        which is only aborted when all the solvers have failed.
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability returned by the fastest solver.
+        """
+        self.result = ""
+        failed: set[int] = set()
+
+        with DefaultSelector() as selector:
+            for index, solver in enumerate(self.solvers):
+                try:
+                    solver.write_bytes(query)
+                    solver.flush()
+                except SolverAborted:
+                    failed.add(index)
+                    continue
+                if solver.solver.stdout is not None:
+                    selector.register(solver.solver.stdout, EVENT_READ, index)
+                else:
+                    solver.kill()
+                    failed.add(index)
+
+            pending = set(range(len(self.solvers))) - failed
+            while pending and self.result not in ('sat', 'unsat'):
+                for key, _ in selector.select():
+                    pending.discard(key.data)
+                    selector.unregister(key.fileobj)
+                    try:
+                        result = self.solvers[key.data].readline()
+                    except SolverAborted:
+                        failed.add(key.data)
+                        continue
+                    self.result = result
+                    if self.result in ('sat', 'unsat'):
+                        break
+
+            # Replace the solvers still running (the ones that have already answered are kept)
+            answered = {key.data for key, _ in selector.select(timeout=0)} if pending else set()
+            for index in pending:
+                if index in answered:
+                    try:
+                        self.solvers[index].readline()
+                    except SolverAborted:
+                        failed.add(index)
+                else:
+                    self.replace(index)
+
+        # Drop the failed solvers
+        if failed:
+            self.solvers = [solver for index, solver in enumerate(self.solvers) if index not in failed]
+            self.options = [options for index, options in enumerate(self.options) if index not in failed]
+            if not self.solvers:
+                self.abort()
+
+        if self.debug:
+            self.readline()
+            debug_flush()
+
+        if self.result == 'sat':
+            return True
+        elif self.result == 'unsat':
+            return False
+        elif not no_check:
+            self.abort()
+
+        return None
+
+    def replace(self, index: int) -> None:
+        """ Kill a solver and start a new one replaying the instructions.
+
+        Parameters
+        ----------
+        index : int
+            Index of the solver.
+        """
+        self.solvers[index].kill()
+        self.solvers[index] = solver = Z3(timeout=self.timeout, options=self.options[index])
+
+        # Scopes are replayed through `push` / `pop`, to keep the declarations of the solver consistent
+        for input in self.transcript:
+            if input == SCOPE_PUSH:
+                solver.push()
+            elif input == SCOPE_POP:
+                solver.pop()
+            else:
+                solver.write(input)
+
+
+class Z3Pool:
+    """ Pool of long-running z3 processes.
+
+    Note
+    ----
+    Solvers are started beforehand, and reset when released instead of being killed.
+
+    Attributes
+    ----------
+    solvers : Queue of Z3
+        Available solvers.
+    debug : bool
+        Debugging flag.
+    timeout : int
+        Timeout of the solvers.
+    """
+
+    def __init__(self, size: Optional[int] = None, debug: bool = False, timeout: int = 0) -> None:
+        """ Initializer.
+
+        Parameters
+        ----------
+        size : int, optional
+            Number of solvers (number of CPUs by default).
+        debug : bool, optional
+            Debugging flag.
+        timeout : int, optional
+            Timeout of the solvers.
+        """
+        self.debug: bool = debug
+        self.timeout: int = timeout
+
+        from queue import Queue
+        self.solvers: Queue[Z3] = Queue()
+        for solver in Z3.warm_spawn(size if size is not None else cpu_count() or 1, debug=debug, timeout=timeout):
+            self.solvers.put(solver)
+
+    def spawn(self) -> Z3:
+        """ Start a new solver.
+
+        Returns
+        -------
+        Z3
+            A z3 process.
+        """
+        return Z3(debug=self.debug, timeout=self.timeout)
+
+    def acquire(self) -> Z3:
+        """ Get an available solver (blocking).
+
+        Returns
+        -------
+        Z3
+            A z3 process.
+        """
+        return self.solvers.get()
+
+    def release(self, solver: Z3) -> None:
+        """ Give a solver back to the pool.
+
+        Note
+        ----
+        The solver is reset, or replaced if it is not healthy anymore.
+
+        Parameters
+        ----------
+        solver : Z3
+            A z3 process acquired from the pool.
+        """
+        # The reset is buffered until the next query
+        if not self.healthy(solver) or not solver.reuse():
+            solver.kill()
+            solver = self.spawn()
+
+        self.solvers.put(solver)
+
+    @staticmethod
+    def healthy(solver: Z3) -> bool:
+        """ Check that a solver can still be used.
+
+        Parameters
+        ----------
+        solver : Z3
+            A z3 process.
+
+        Returns
+        -------
+        bool
+            True if the process is alive and its pipes are open.
+        """
+        return not solver.aborted and solver.solver.poll() is None and solver.solver.stdin is not None and not solver.solver.stdin.closed
+
+
+# Available z3 backends
+BACKENDS = {
+    'process': Z3,
+    'bindings': Z3InProcess,
+    'portfolio': PortfolioZ3
+}
@@ -25,9 +25,13 @@ __license__ = "GPLv3"
 __version__ = "1.0"
 
 from abc import ABC, abstractmethod
-from collections import deque
-from re import search, split
-from typing import Optional, Sequence
+from functools import lru_cache
+from operator import eq, ge, gt, le, lt, ne
+from os import stat
+from os.path import realpath
+from re import compile as re_compile
+from sys import intern
+from typing import Optional, Sequence, Union
 
 from usmpt.ptio.verdict import Verdict
 
@@ -42,6 +46,179 @@ LTL_TO_BOOLEAN_CONSTANTS = {
     'F': False
 }
 
+# Tokens: boolean operators, parentheses, negation and members/atoms (`{...}` quotes a name)
+LTL_TOKEN = re_compile(r"/\\|\\/|[()\-]|(?:\{[^}]*\}?|[^()\-/\\]|/(?!\\)|\\(?!/))+")
+
+SMTLIB_TO_PYTHON_OPERATORS = {
+    '=': eq,
+    '<=': le,
+    '>=': ge,
+    '<': lt,
+    '>': gt,
+    'distinct': ne
+}
+
+# Parsed formulas, by text or by (real path, modification time)
+PARSED_FORMULAS: dict[Union[str, tuple[str, int]], Expression] = {}
+
+# Number of place names at a given iteration (`pl@k`) kept
+PLACES_AT_ITERATION_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=PLACES_AT_ITERATION_SIZE)
+def _place_at(pl: str, k: Optional[int]) -> str:
+    """ Name of a place at a given iteration.
+
+    Parameters
+    ----------
+    pl : str
+        Place name.
+    k : int, optional
+        Iteration number.
+
+    Returns
+    -------
+    str
+        `pl@k`, or `pl` if no iteration is given.
+    """
+    return pl if k is None else f"{pl}@{k}"
+
+
+def _emit_iterative(root: StateFormula, out: list[str], k: Optional[int] = None, sat: bool = False) -> None:
+    """ Append the SMT-LIB fragments of a state formula without recursing on nested state formulas.
+
+    Note
+    ----
+    The work stack holds fragments still to append (str) and expressions still to expand.
+
+    Parameters
+    ----------
+    root : StateFormula
+        State formula to emit.
+    out : list of str
+        Output fragments.
+    k : int, optional
+        Iteration number.
+    sat : bool, optional
+        SAT encoding flag.
+    """
+    stack: list[Union[str, SimpleExpression]] = [root]
+
+    while stack:
+        task = stack.pop()
+
+        if isinstance(task, str):
+            out.append(task)
+
+        elif isinstance(task, StateFormula):
+            if len(task.operands) == 1 and task.operator != 'not':
+                stack.append(task.operands[0])
+                continue
+
+            # Pushed in reverse order: `(operator operand_1 ... operand_n)`
+            stack.append(')')
+            for operand in reversed(task.operands):
+                stack.append(operand)
+                stack.append(' ')
+            stack.append('(' + task.operator)
+
+        elif sat:
+            task._emit_sat(out, k)
+
+        else:
+            task._emit(out, k)
+
+
+def _tokenize(formula: str) -> list[str]:
+    """ Formula lexer.
+
+    Parameters
+    ----------
+    formula : str
+        Formula (.ltl format).
+
+    Returns
+    -------
+    list of str
+        Tokens.
+    """
+    tokens = LTL_TOKEN.findall(formula.replace(' ', ''))
+    if '{' in formula or '}' in formula:
+        tokens = [token.replace('{', '').replace('}', '') for token in tokens]
+    return tokens
+
+
+def _member_constructor(member: str) -> SimpleExpression:
+    """ Member of an atom parser.
+
+    Parameters
+    ----------
+    member : str
+        Member (k_1 * p_1 + ... + k_n * p_n + K).
+
+    Returns
+    -------
+    SimpleExpression
+        TokenCount, or IntegerConstant if the member has no place.
+    """
+    places, integer_constant, multipliers = [], 0, {}
+
+    # Single pass over the elements `k * p` or `K` separated by `+`
+    start, length = 0, len(member)
+    while True:
+        end = member.find('+', start)
+        if end < 0:
+            end = length
+
+        # Constant (single conversion, no `isnumeric` pre-scan)
+        star, constant = member.rfind('*', start, end), None
+        if star < 0:
+            try:
+                constant = int(member[start:end])
+            except ValueError:
+                pass
+
+        if constant is not None:
+            integer_constant += constant
+        else:
+            # Place names are shared by many atoms
+            variable = intern(member[star + 1 if star >= 0 else start:end])
+            places.append(variable)
+
+            if star >= 0:
+                multipliers[variable] = int(member[start:member.find('*', start, end)])
+
+        if end == length:
+            break
+        start = end + 1
+
+    if places:
+        return TokenCount(places, multipliers)
+    else:
+        return IntegerConstant(integer_constant)
+
+
+def _find_comparison_operator(text: str) -> Optional[tuple[int, str]]:
+    """ Locate the comparison operator of an atom in a single pass.
+
+    Parameters
+    ----------
+    text : str
+        Atom token.
+
+    Returns
+    -------
+    tuple of int, str, optional
+        Position and operator (=, <=, >=, <, >, !=), `None` if there is no operator.
+    """
+    for index, c in enumerate(text):
+        if c in '<>=!':
+            if text[index + 1:index + 2] == '=' and c != '=':
+                return index, c + '='
+            if c != '!':
+                return index, c
+    return None
+
 
 class Formula:
     """ Properties.
@@ -62,14 +239,22 @@ class Formula:
         path_formula : str, optional
             Path to reachability formula.
         """
+        # Parsed formulas are shared (expressions are never modified after parsing)
+        key: Union[str, tuple[str, int]]
         if formula is None:
             if path_formula is not None:
-                with open(path_formula, 'r') as fp:
-                    formula = fp.read().strip()
+                key = (realpath(path_formula), stat(path_formula).st_mtime_ns)
+                if key not in PARSED_FORMULAS:
+                    with open(path_formula, 'r') as fp:
+                        PARSED_FORMULAS[key] = self.parse_formula(fp.read().strip())
             else:
                 raise ValueError
+        else:
+            key = formula
+            if key not in PARSED_FORMULAS:
+                PARSED_FORMULAS[key] = self.parse_formula(formula)
 
-        self.F: Expression = self.parse_formula(formula)
+        self.F: Expression = PARSED_FORMULAS[key]
 
     def __str__(self) -> str:
         """ Properties to textual format.
@@ -119,6 +304,25 @@ class Formula:
         """
         return self.F.smtlib_sat(k, assertion=assertion, negation=negation)
 
+    def evaluate(self, marking: dict[str, int]) -> Optional[bool]:
+        """ Evaluate the property on a marking.
+
+        Parameters
+        ----------
+        marking : dict of str: int
+            Marking (number of tokens of each place).
+
+        Returns
+        -------
+        bool, optional
+            Satisfiability of the property by the marking,
+            `None` if the property refers to places missing from the marking.
+        """
+        try:
+            return self.F.evaluate(marking)
+        except KeyError:
+            return None
+
     def parse_formula(self, formula: str) -> Expression:
         """ Formula parser.
 
@@ -132,68 +336,12 @@ class Formula:
         Expression
             Parsed formula.
         """
-        def _tokenize(s):
-            tokens = []
-            buffer, last = "", ""
-            open_brace = False
-
-            for c in s:
-
-                if c == ' ':
-                    continue
-
-                elif (c == '/' and last == '\\') or (c == '\\' and last == '/'):
-                    if buffer:
-                        tokens.append(buffer)
-                    tokens.append(last + c)
-                    buffer, last = "", ""
-
-                elif (c == '-' and not open_brace) or c in ['(', ')']:
-                    if last:
-                        tokens.append(buffer + last)
-                    tokens.append(c)
-                    buffer, last = "", ""
-
-                elif c == '{':
-                    open_brace = True
-
-                elif c == '}':
-                    open_brace = False
-
-                else:
-                    buffer += last
-                    last = c
-
-            if buffer or last:
-                tokens.append(buffer + last)
-
-            return tokens
-
-        def _member_constructor(member):
-            places, integer_constant, multipliers = [], 0, {}
-
-            for element in member.split('+'):
-                if element.isnumeric():
-                    integer_constant += int(element)
-                else:
-                    split_element = element.split('*')
-                    variable = split_element[-1]
-                    places.append(variable)
-
-                    if len(split_element) > 1:
-                        multipliers[variable] = int(split_element[0])
-
-            if places:
-                return TokenCount(places, multipliers)
-            else:
-                return IntegerConstant(integer_constant)
-
         # Number of opened parenthesis (not close)
         open_parenthesis = 0
 
         # Stacks: operators and operands
-        stack_operator: deque[tuple[str, int]] = deque()
-        stack_operands: deque[list[Expression]] = deque([[]])
+        stack_operator: list[tuple[str, int]] = []
+        stack_operands: list[list[Expression]] = [[]]
 
         # Current operator
         current_operator = None
@@ -247,20 +395,21 @@ class Formula:
                 current_operator = stack_operator[-1][0] if stack_operator and stack_operator[-1][-1] == open_parenthesis else None
 
             elif token in ['T', 'F']:
-                # Construct BooleanConstant
-                stack_operands[-1].append(BooleanConstant(token == 'T'))
+                # Reuse the shared BooleanConstant
+                stack_operands[-1].append(BOOLEAN_CONSTANTS[token])
 
             else:
                 # Construct Atom
-                if search("(<=|>=|!=|<|>|=)", token):
+                comparison = _find_comparison_operator(token)
+                if comparison is not None:
+                    position, operator = comparison
+                    right = token[position + len(operator):]
                     if parse_atom:
-                        _, operator, right = split("(<=|>=|<|>|=)", token)
                         stack_operands[-1].append(Atom(stack_operands[-1].pop(), _member_constructor(right), operator))
                         parse_atom = False
 
                     else:
-                        left, operator, right = split("(<=|>=|!=|<|>|=)", token)
-                        stack_operands[-1].append(Atom(_member_constructor(left), _member_constructor(right), operator))
+                        stack_operands[-1].append(Atom(_member_constructor(token[:position]), _member_constructor(right), operator))
                 else:
                     stack_operands[-1].append(_member_constructor(token))
                     parse_atom = True
@@ -305,6 +454,8 @@ class SimpleExpression(ABC):
     Cannot be evaluated to 'TRUE' or 'FALSE'.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def __str__(self) -> str:
         """ SimpleExpression to textual format.
@@ -348,6 +499,48 @@ class SimpleExpression(ABC):
         """
         pass
 
+    @abstractmethod
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        """ Append the SMT-LIB fragments of the SimpleExpression.
+
+        Parameters
+        ----------
+        out : list of str
+            Output fragments.
+        k : int, optional
+            Iteration number.
+        """
+        pass
+
+    @abstractmethod
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        """ Append the SMT-LIB fragments of the SimpleExpression (SAT encoding).
+
+        Parameters
+        ----------
+        out : list of str
+            Output fragments.
+        k : int, optional
+            Iteration number.
+        """
+        pass
+
+    @abstractmethod
+    def evaluate(self, marking: dict[str, int]) -> int:
+        """ Evaluate the SimpleExpression on a marking.
+
+        Parameters
+        ----------
+        marking : dict of str: int
+            Marking (number of tokens of each place).
+
+        Returns
+        -------
+        int
+            Value of the SimpleExpression.
+        """
+        pass
+
 class Expression(SimpleExpression):
     """ Expression.
 
@@ -356,6 +549,8 @@ class Expression(SimpleExpression):
     Can be evaluated to 'TRUE' or 'FALSE'.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def smtlib(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
         """ Assert the Expression.
@@ -396,6 +591,22 @@ class Expression(SimpleExpression):
         """
         pass
 
+    @abstractmethod
+    def evaluate(self, marking: dict[str, int]) -> bool:
+        """ Evaluate the Expression on a marking.
+
+        Parameters
+        ----------
+        marking : dict of str: int
+            Marking (number of tokens of each place).
+
+        Returns
+        -------
+        bool
+            Satisfiability of the Expression by the marking.
+        """
+        pass
+
 
 class StateFormula(Expression):
     """ StateFormula.
@@ -406,8 +617,12 @@ class StateFormula(Expression):
         A list of operands.
     operator : str
         A boolean operator (not, and, or).
+    _smt_cache : dict of tuple: str
+        SMT-LIB outputs already computed without iteration (by SAT encoding, assertion and negation flags).
     """
 
+    __slots__ = ('operands', 'operator', '_smt_cache')
+
     def __init__(self, operands: Sequence[Expression], operator: str) -> None:
         """ Initializer.
 
@@ -423,53 +638,93 @@ class StateFormula(Expression):
         ValueError
             Invalid operator for a StateFormula.
         """
-        self.operands: Sequence[Expression] = operands
-
         self.operator: str = ''
         if operator in ['not', 'and', 'or']:
             self.operator = operator
         else:
             raise ValueError("Invalid operator for a state formula")
 
+        # Flatten nested conjunctions and disjunctions (n-ary in SMT-LIB)
+        if operator != 'not' and any(isinstance(operand, StateFormula) and operand.operator == operator for operand in operands):
+            flat_operands: list[Expression] = []
+            for operand in operands:
+                if isinstance(operand, StateFormula) and operand.operator == operator:
+                    flat_operands.extend(operand.operands)
+                else:
+                    flat_operands.append(operand)
+            operands = flat_operands
+
+        self.operands: Sequence[Expression] = operands
+
+        # Expressions are never modified after parsing (the outputs at a given iteration are not kept)
+        self._smt_cache: dict[tuple, str] = {}
+
     def __str__(self) -> str:
         if self.operator == 'not':
-            return "(not {})".format(self.operands[0])
+            return f"(not {self.operands[0]})"
 
-        text = " {} ".format(self.operator).join(map(str, self.operands))
+        text = f" {self.operator} ".join(map(str, self.operands))
 
         if len(self.operands) > 1:
-            text = "({})".format(text)
+            text = f"({text})"
 
         return text
 
     def smtlib(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
-        smt_input = ' '.join(map(lambda operand: operand.smtlib(k), self.operands))
+        key = (False, assertion, negation)
+        if k is None and key in self._smt_cache:
+            return self._smt_cache[key]
 
-        if len(self.operands) > 1 or self.operator == 'not':
-            smt_input = "({} {})".format(self.operator, smt_input)
+        out: list[str] = []
+        _emit_iterative(self, out, k)
+        smt_input = ''.join(out)
 
         if negation:
-            smt_input = "(not {})".format(smt_input)
+            smt_input = f"(not {smt_input})"
 
         if assertion:
-            smt_input = "(assert {})\n".format(smt_input)
+            smt_input = f"(assert {smt_input})\n"
+
+        if k is None:
+            self._smt_cache[key] = smt_input
 
         return smt_input
 
     def smtlib_sat(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
-        smt_input = ' '.join(map(lambda operand: operand.smtlib_sat(k), self.operands))
+        key = (True, assertion, negation)
+        if k is None and key in self._smt_cache:
+            return self._smt_cache[key]
 
-        if len(self.operands) > 1 or self.operator == 'not':
-            smt_input = "({} {})".format(self.operator, smt_input)
+        out: list[str] = []
+        _emit_iterative(self, out, k, sat=True)
+        smt_input = ''.join(out)
 
         if negation:
-            smt_input = "(not {})".format(smt_input)
+            smt_input = f"(not {smt_input})"
 
         if assertion:
-            smt_input = "(assert {})\n".format(smt_input)
+            smt_input = f"(assert {smt_input})\n"
+
+        if k is None:
+            self._smt_cache[key] = smt_input
 
         return smt_input
 
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        _emit_iterative(self, out, k)
+
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        _emit_iterative(self, out, k, sat=True)
+
+    def evaluate(self, marking: dict[str, int]) -> bool:
+        if self.operator == 'not':
+            return not self.operands[0].evaluate(marking)
+
+        if self.operator == 'and':
+            return all(operand.evaluate(marking) for operand in self.operands)
+
+        return any(operand.evaluate(marking) for operand in self.operands)
+
 
 class Atom(Expression):
     """ Atom.
@@ -482,8 +737,14 @@ class Atom(Expression):
         Right operand.
     operator : str
         Operator (=, <=, >=, <, >, distinct).
+    _smt_cache : dict of tuple: str
+        SMT-LIB outputs already computed without iteration (by SAT encoding, assertion and negation flags).
+    _static_smt : str, optional
+        SMT-LIB output if the atom does not depend on the iteration.
     """
 
+    __slots__ = ('left_operand', 'right_operand', 'operator', '_smt_cache', '_static_smt')
+
     def __init__(self, left_operand: SimpleExpression, right_operand: SimpleExpression, operator: str) -> None:
         """ Initializer.
 
@@ -509,32 +770,80 @@ class Atom(Expression):
 
         self.operator: str = operator if operator != '!=' else 'distinct'
 
+        # Expressions are never modified after parsing (the outputs at a given iteration are not kept)
+        self._smt_cache: dict[tuple, str] = {}
+
+        # Atoms over constants are rendered once for all iterations
+        self._static_smt: Optional[str] = None
+        if isinstance(left_operand, IntegerConstant) and isinstance(right_operand, IntegerConstant):
+            self._static_smt = f"({self.operator} {left_operand.smtlib()} {right_operand.smtlib()})"
+
     def __str__(self) -> str:
-        return "({} {} {})".format(self.left_operand, self.operator, self.right_operand)
+        return f"({self.left_operand} {self.operator} {self.right_operand})"
 
     def smtlib(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
-        smt_input = "({} {} {})".format(self.operator, self.left_operand.smtlib(k), self.right_operand.smtlib(k))
+        key = (False, assertion, negation)
+        if k is None and key in self._smt_cache:
+            return self._smt_cache[key]
+
+        out: list[str] = []
+        self._emit(out, k)
+        smt_input = ''.join(out)
 
         if negation:
-            smt_input = "(not {})".format(smt_input)
+            smt_input = f"(not {smt_input})"
 
         if assertion:
-            smt_input = "(assert {})\n".format(smt_input)
+            smt_input = f"(assert {smt_input})\n"
+
+        if k is None:
+            self._smt_cache[key] = smt_input
 
         return smt_input
 
     def smtlib_sat(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
         assert self.operator in ['=', 'distinct']
-        smt_input = "({} {} {})".format(self.operator, self.left_operand.smtlib_sat(k), self.right_operand.smtlib_sat(k))
+        key = (True, assertion, negation)
+        if k is None and key in self._smt_cache:
+            return self._smt_cache[key]
+
+        out: list[str] = []
+        self._emit_sat(out, k)
+        smt_input = ''.join(out)
 
         if negation:
-            smt_input = "(not {})".format(smt_input)
+            smt_input = f"(not {smt_input})"
 
         if assertion:
-            smt_input = "(assert {})\n".format(smt_input)
+            smt_input = f"(assert {smt_input})\n"
+
+        if k is None:
+            self._smt_cache[key] = smt_input
 
         return smt_input
 
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        if self._static_smt is not None:
+            out.append(self._static_smt)
+            return
+
+        out.append('(' + self.operator + ' ')
+        self.left_operand._emit(out, k)
+        out.append(' ')
+        self.right_operand._emit(out, k)
+        out.append(')')
+
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        assert self.operator in ['=', 'distinct']
+        out.append('(' + self.operator + ' ')
+        self.left_operand._emit_sat(out, k)
+        out.append(' ')
+        self.right_operand._emit_sat(out, k)
+        out.append(')')
+
+    def evaluate(self, marking: dict[str, int]) -> bool:
+        return SMTLIB_TO_PYTHON_OPERATORS[self.operator](self.left_operand.evaluate(marking), self.right_operand.evaluate(marking))
+
 
 class BooleanConstant(Expression):
     """ Boolean constant.
@@ -545,6 +854,8 @@ class BooleanConstant(Expression):
         A boolean constant.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value: bool) -> None:
         """ Initializer.
 
@@ -562,16 +873,29 @@ class BooleanConstant(Expression):
         smt_input = str(self).lower()
 
         if negation:
-            smt_input = "(not {})".format(smt_input)
+            smt_input = f"(not {smt_input})"
 
         if assertion:
-            smt_input = "(assert {})\n".format(smt_input)
+            smt_input = f"(assert {smt_input})\n"
 
         return smt_input
 
     def smtlib_sat(self, k: Optional[int] = None, assertion: bool = False, negation: bool = False) -> str:
         return self.smtlib(k=k, assertion=assertion, negation=negation)
 
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(str(self).lower())
+
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(str(self).lower())
+
+    def evaluate(self, marking: dict[str, int]) -> bool:
+        return self.value
+
+
+# Shared boolean constants (`T` and `F`)
+BOOLEAN_CONSTANTS = {token: BooleanConstant(value) for token, value in LTL_TO_BOOLEAN_CONSTANTS.items()}
+
 
 class TokenCount(SimpleExpression):
     """ Token count.
@@ -586,8 +910,12 @@ class TokenCount(SimpleExpression):
         Place multipliers (missing if 1).
     integer_constant : int, optional
         Constant.
+    _smt_cache : dict of bool: str
+        SMT-LIB outputs already computed without iteration (by SAT encoding flag).
     """
 
+    __slots__ = ('places', 'multipliers', 'integer_constant', '_smt_cache')
+
     def __init__(self, places: list[str], multipliers: Optional[dict[str, int]] = None, integer_constant: Optional[int] = None):
         """ Initializer.
 
@@ -604,8 +932,12 @@ class TokenCount(SimpleExpression):
         self.multipliers: Optional[dict[str, int]] = multipliers
         self.integer_constant: Optional[int] = integer_constant
 
+        # Expressions are never modified after parsing (the outputs at a given iteration are not kept)
+        self._smt_cache: dict[bool, str] = {}
+
     def __str__(self) -> str:
-        text = ' + '.join(map(lambda pl: pl if self.multipliers is None or pl not in self.multipliers else "({}.{})".format(self.multipliers[pl], pl), self.places))
+        multipliers = self.multipliers or {}
+        text = ' + '.join(pl if pl not in multipliers else f"({multipliers[pl]}.{pl})" for pl in self.places)
 
         if self.integer_constant:
             text += " + " + str(self.integer_constant)
@@ -613,30 +945,53 @@ class TokenCount(SimpleExpression):
         return text
 
     def smtlib(self, k: Optional[int] = None) -> str:
-        def place_smtlib(pl, k):
-            pl_iteration = pl if k is None else "{}@{}".format(pl, k)
-            return pl_iteration if self.multipliers is None or pl not in self.multipliers else "(* {} {})".format(pl_iteration, self.multipliers[pl])
+        if k is None and False in self._smt_cache:
+            return self._smt_cache[False]
 
-        smt_input = ' '.join(map(lambda pl: place_smtlib(pl, k), self.places))
+        multipliers = self.multipliers or {}
+        smt_input = ' '.join(_place_at(pl, k) if pl not in multipliers else f"(* {_place_at(pl, k)} {multipliers[pl]})" for pl in self.places)
 
         if self.integer_constant:
             smt_input += ' ' + str(self.integer_constant)
 
         if len(self.places) > 1 or self.integer_constant:
-            smt_input = "(+ {})".format(smt_input)
+            smt_input = f"(+ {smt_input})"
+
+        if k is None:
+            self._smt_cache[False] = smt_input
 
         return smt_input
 
     def smtlib_sat(self, k: Optional[int] = None) -> str:
         assert not self.integer_constant
         assert not self.multipliers
-        smt_input = ' '.join(map(lambda pl: pl if k is None else "{}@{}".format(pl, k), self.places))
+        if k is None and True in self._smt_cache:
+            return self._smt_cache[True]
+
+        smt_input = ' '.join(_place_at(pl, k) for pl in self.places)
 
         if len(self.places) > 1 or self.integer_constant:
-            smt_input = "(or {})".format(smt_input)
+            smt_input = f"(or {smt_input})"
+
+        if k is None:
+            self._smt_cache[True] = smt_input
 
         return smt_input
 
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(self.smtlib(k))
+
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(self.smtlib_sat(k))
+
+    def evaluate(self, marking: dict[str, int]) -> int:
+        value = sum(marking[pl] if self.multipliers is None or pl not in self.multipliers else self.multipliers[pl] * marking[pl] for pl in self.places)
+
+        if self.integer_constant:
+            value += self.integer_constant
+
+        return value
+
 class IntegerConstant(SimpleExpression):
     """ Integer constant.
 
@@ -644,8 +999,12 @@ class IntegerConstant(SimpleExpression):
     ----------
     value : int
         Constant.
+    _smt : str
+        SMT-LIB format.
     """
 
+    __slots__ = ('value', '_smt')
+
     def __init__(self, value: int) -> None:
         """ Initializer.
 
@@ -655,12 +1014,13 @@ class IntegerConstant(SimpleExpression):
             Constant.
         """
         self.value = value
+        self._smt: str = str(value)
 
     def __str__(self) -> str:
-        return str(self.value)
+        return self._smt
 
     def smtlib(self, k: Optional[int] = None) -> str:
-        return str(self)
+        return self._smt
 
     def smtlib_sat(self, k: Optional[int] = None) -> str:
         assert self.value in [0, 1]
@@ -668,3 +1028,12 @@ class IntegerConstant(SimpleExpression):
             return "true"
         else:
             return "false"
+
+    def _emit(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(self._smt)
+
+    def _emit_sat(self, out: list[str], k: Optional[int] = None) -> None:
+        out.append(self.smtlib_sat(k))
+
+    def evaluate(self, marking: dict[str, int]) -> int:
+        return self.value
@@ -27,9 +27,9 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
-from re import split
-from sys import exit
-from typing import Optional
+from re import compile as re_compile
+from sys import exit, intern
+from typing import Iterator, Optional
 
 MULTIPLIER_TO_INT = {
     'K': 1000,
@@ -40,6 +40,12 @@ MULTIPLIER_TO_INT = {
     'E': 1000000000000000000
 }
 
+# Label following an identifier: `: label` or `: {label with spaces}`
+LABEL = re_compile(r':\s*(?:\{[^}]*\}|\S+)')
+
+# '#' and ',' forbidden in SMT-LIB
+FORBIDDEN_CHARACTERS = bytes.maketrans(b'#,', b'..')
+
 pl_id         = str
 tr_id         = str
 arc_weight    = int
@@ -96,6 +102,15 @@ class PetriNet:
         # Parse the `.net` file
         self.parse_net(filename)
 
+        # Fragments of the place declarations, joined by the iteration suffix
+        self._declare_template: list[str] = []
+        append, fragment = self._declare_template.append, ""
+        for pl in self.places:
+            append(f"{fragment}(declare-const {pl}")
+            append(f" Int)\n(assert (>= {pl}")
+            fragment = " 0))\n"
+        append(fragment)
+
     def __str__(self) -> str:
         """ Petri net to .net format.
 
@@ -104,32 +119,20 @@ class PetriNet:
         str
             .net format.
         """
-        text = ""
+        def str_arc(pl: str, weight: int) -> str:
+            return f"{weight}*{pl}" if weight != 1 else pl
 
-        for tr in self.transitions:
-            text += "tr {}".format(tr)
-            
-            for pl, weight in self.pre[tr].items():
-                if weight != 1:
-                    text += " {}*{}".format(weight, pl)
-                else:
-                    text += " {}".format(pl)
-
-            text += " ->"
-
-            for pl, weight in self.post[tr].items():
-                if weight != 1:
-                    text += " {}*{}".format(weight, pl)
-                else:
-                    text += " {}".format(pl)
-        
-            text += "\n"
+        text: list[str] = []
 
+        for tr in self.transitions:
+            inputs = (str_arc(pl, weight) for pl, weight in self.pre[tr].items())
+            outputs = (str_arc(pl, weight) for pl, weight in self.post[tr].items())
+            text.append(' '.join(["tr", tr, *inputs, "->", *outputs]) + "\n")
 
         for pl, marking in self.initial_marking.items():
-            text += "pl {} ({})\n".format(pl, marking)
+            text.append(f"pl {pl} ({marking})\n")
 
-        return text
+        return ''.join(text)
 
     def smtlib_declare_places(self, k: Optional[int] = None) -> str:
         """ Declare variables corresponding to the number of tokens
@@ -145,15 +148,7 @@ class PetriNet:
         str
             SMT-LIB format.
         """
-
-        smt_input = ""
-        
-        for pl in self.places:
-            var = pl if k is None else "{}@{}".format(pl, k)
-            smt_input += "(declare-const {} Int)\n".format(var)
-            smt_input += "(assert (>= {} 0))\n".format(var)
-
-        return smt_input
+        return ("" if k is None else f"@{k}").join(self._declare_template)
 
     ######################
     # TODO: Sect. 2.3.1. #
@@ -177,13 +172,15 @@ class PetriNet:
     ######################
     # TODO: Sect. 2.3.1. #
     ######################
-    def smtlib_transition_relation(self, k: int, k_prime: int) -> str:
+    def smtlib_transition_relation(self, k: int, k_prime: int, guard: Optional[str] = None) -> str:
         """ Transition relation from places at iteration k to iteration k + 1.
         
         Parameters
         ----------
         k : int
             Iteration.
+        guard : str, optional
+            Boolean literal guarding the relation: `(assert (=> guard ...))`.
 
         Returns
         -------
@@ -206,127 +203,123 @@ class PetriNet:
         FileNotFoundError
             Petri net file not found.
         """
+        # Bound methods used on every line
+        parse_transition, parse_place, parse_label = self.parse_transition, self.parse_place, self.parse_label
+
         try:
-            with open(filename, 'r') as fp:
-                for line in fp.readlines():
+            with open(filename, 'rb') as fp:
+                for line in fp:
+
+                    # Only decode transitions and places
+                    if not line.lstrip().startswith((b'tr', b'pl')):
+                        continue
 
                     # '#' and ',' forbidden in SMT-LIB
-                    content = split(r'\s+', line.strip().replace('#', '.').replace(',', '.'))
+                    content = line.translate(FORBIDDEN_CHARACTERS).decode().split(None, 2)
 
-                    # Skip empty lines and get the first identifier
-                    if not content:
+                    # Skip lines without identifier, get the element and the identifier
+                    if len(content) < 2:
                         continue
                     else:
-                        element = content.pop(0)
+                        element, identifier = content[0], content[1]
+
+                    # Remaining content without label
+                    content = parse_label(content[2]) if len(content) > 2 else []
 
                     # Transition arcs
                     if element == "tr":
-                        self.parse_transition(content)
+                        parse_transition(identifier, content)
 
                     # Place
                     if element == "pl":
-                        self.parse_place(content)
-            fp.close()
+                        parse_place(identifier, content)
         except FileNotFoundError as e:
             exit("Error: Input file not found")
 
-    def parse_transition(self, content: list[str]) -> None:
+    def parse_transition(self, transition_id: str, content: list[str]) -> None:
         """ Transition parser.
 
         Parameters
         ----------
+        transition_id : str
+            Transition identifier.
         content : list of string
-            Content to parse (.net format).
+            Arcs to parse (.net format).
         """
-        transition_id = content.pop(0)
+        transition_id = intern(transition_id)
 
         self.transitions.add(transition_id)
-        self.pre[transition_id] = {}
-        self.post[transition_id] = {}
-
-        content = self.parse_label(content)
-
-        arrow = content.index("->")
-        inputs = content[0:arrow]
-        outputs = content[arrow + 1:]
-
-        for arc in inputs:
-            self.parse_arc(arc, transition_id, self.pre)
-
-        for arc in outputs:
-            self.parse_arc(arc, transition_id, self.post)
-
-    def parse_arc(self, content: str, transition_id: str, arcs: dict[tr_id, dict[pl_id, int]]) -> None:
+        pre = self.pre[transition_id] = {}
+        post = self.post[transition_id] = {}
+
+        # Input arcs until `->`, then output arcs
+        parse_arc, arcs = self.parse_arc, pre
+        for arc in content:
+            if arc == "->":
+                arcs = post
+            else:
+                parse_arc(arc, arcs)
+
+    def parse_arc(self, content: str, arcs: dict[pl_id, arc_weight]) -> None:
         """ Arc parser.
 
         Parameters
         ----------
-        content : list of str
+        content : str
             Content to parse (.net format).
-        transition : str
-            Transition that is parsed.
-        arcs : dict of str: dict of str: int
-            Pre or Post vectors (if parsing before or after ->).
+        arcs : dict of str: int
+            Pre or Post vector of the parsed transition (if parsing before or after ->).
         """
-        content = content
+        place_id, star, weight_str = content.partition('*')
+        weight = self.parse_value(weight_str) if star else 1
 
-        if '*' in content:
-            place_id, _, weight_str = content.partition('*')
-            weight = self.parse_value(weight_str)
-        else:
-            place_id = content
-            weight = 1
+        # Place names are shared by all the incident transitions
+        place_id = intern(place_id)
 
         if place_id not in self.places:
             self.places.add(place_id)
             self.initial_marking[place_id] = 0
 
-        arcs[transition_id][place_id] = arcs[transition_id].get(place_id, 0) + weight
+        arcs[place_id] = arcs.get(place_id, 0) + weight
 
-    def parse_place(self, content: list[str]) -> None:
+    def parse_place(self, place_id: str, content: list[str]) -> None:
         """ Place parser.
 
         Parameters
         ----------
+        place_id : str
+            Place identifier.
         content : list of str
-            Place to parse (.net format).
+            Initial marking to parse (.net format).
         """
-        place_id = content.pop(0)
-
-        content = self.parse_label(content)
+        place_id = intern(place_id)
 
         if content:
             initial_marking = self.parse_value(content[0].replace('(', '').replace(')', ''))
         else:
             initial_marking = 0
 
-        if place_id not in self.places:
-            self.places.add(place_id)
-
+        self.places.add(place_id)
         self.initial_marking[place_id] = initial_marking
 
-    def parse_label(self, content: list[str]) -> list[str]:
+    def parse_label(self, content: str) -> list[str]:
         """ Label parser.
 
         Parameters
         ----------
-        content : list of str
-            Content to parse (.net format).
+        content : str
+            Content following an identifier (.net format).
 
         Returns
         -------
         list of str
-            Content without labels.
+            Content without label, split on whitespaces.
 
         """
-        index = 0
-        if content and content[index] == ':':
-            label_skipped = content[index + 1][0] != '{'
-            index = 2
-            while not label_skipped:
-                label_skipped = content[index][-1] == '}'
-                index += 1
-        return content[index:]
+        label = LABEL.match(content)
+        if label:
+            content = content[label.end():]
+        return content.split()
 
     def parse_value(self, content: str) -> int:
         """ Parse integer value.
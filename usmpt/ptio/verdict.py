@@ -22,10 +22,10 @@ __contact__ = "nicolas.amat@onera.fr"
 __license__ = "GPLv3"
 __version__ = "1.0"
 
-from enum import Enum
+from enum import IntEnum
 
 
-class Verdict(Enum):
+class Verdict(IntEnum):
     """ Verdict enum.
 
         Note
@@ -23,6 +23,7 @@ __license__ = "GPLv3"
 __version__ = "1.0"
 
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 
 from usmpt.exec.parallelizer import Parallelizer
@@ -82,6 +83,11 @@ def main():
                                choices=methods,
                                help='enable methods among {}'.format(' '.join(methods)))
 
+    parser.add_argument('--backend',
+                        default='process',
+                        choices=['process', 'bindings', 'portfolio'],
+                        help="z3 backend: an external process fed with SMT-LIB over a pipe (default), the in-process Python bindings (requires z3-solver) or a portfolio of differently configured processes")
+
     group_timeout = parser.add_mutually_exclusive_group()
 
     group_timeout.add_argument('--timeout',
@@ -100,9 +106,15 @@ def main():
     # Set the verbose level
     set_verbose(results.verbose)
 
-    # Read the input Petri net and formula
-    ptnet = PetriNet(results.net)
-    formula = Formula(formula=results.formula) if results.formula else Formula(path_formula=results.path_formula)
+    # Nothing to run nor to print
+    if 'DUMMY' in results.methods and not results.verbose:
+        exit()
+
+    # Read the input Petri net and formula concurrently (overlaps the file reads)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_ptnet = executor.submit(PetriNet, results.net)
+        future_formula = executor.submit(Formula, formula=results.formula, path_formula=results.path_formula)
+        ptnet, formula = future_ptnet.result(), future_formula.result()
     if results.verbose:
         print(ptnet)
         print(formula)
@@ -111,7 +123,7 @@ def main():
         exit()
 
     # Run methods in parallel and get results
-    parallelizer = Parallelizer(ptnet, formula, results.methods, verbose=results.verbose, debug=results.debug)
+    parallelizer = Parallelizer(ptnet, formula, results.methods, verbose=results.verbose, debug=results.debug, backend=results.backend)
     parallelizer.run(results.timeout)
 
     if results.show_time: